@@ -1,10 +1,42 @@
 import os
+import asyncio
+import uuid
+from functools import partial
+from typing import Optional
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from langchain_google_genai import ChatGoogleGenerativeAI
 from leadgpt.agent.lead_agent import LeadGPT
+from leadgpt.session import SessionRegistry
+from leadgpt.assistant.stage_classifier import StageClassifier
+from leadgpt.assistant.turn_planner import TurnPlannerStats
+from leadgpt.llm_cache import get_llm_response_cache
+from leadgpt.tools.policy_search import get_faq_matcher, get_vector_store_manager
+from leadgpt.catalog.pool import get_connection_pool
+from leadgpt.catalog.filters import get_product_filter_parser
+from leadgpt.catalog.templates import get_sql_template_cache
+from leadgpt.catalog.columnar import get_columnar_catalog
+from leadgpt.catalog.guard import get_sql_guard
+from leadgpt.config import (
+    SESSION_MAX_COUNT,
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_MEMORY_MB,
+    TURN_PLANNER_ENABLED,
+    STAGE_CLASSIFIER_PATH,
+    STAGE_CLASSIFIER_THRESHOLD,
+    STAGE_LOG_PATH,
+    LLM_CACHE_CHAINS,
+    DATA_PRODUCT_PATH,
+    PRODUCT_DB_IMMUTABLE,
+    PRODUCT_FILTER_PARSER_ENABLED,
+    PRODUCT_SQL_TEMPLATE_CACHE_ENABLED,
+    PRODUCT_COLUMNAR_ENGINE_ENABLED,
+    PRODUCT_SQL_GUARD_ENABLED,
+    FAQ_FAST_PATH_ENABLED,
+)
 import json
 from langchain_groq import ChatGroq
 
@@ -23,10 +55,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize LeadGPT
+# Initialize LeadGPT sessions (LLM clients and tools are shared by all sessions)
 llm = ChatGoogleGenerativeAI(temperature=0, model="gemini-1.5-flash")
-llm_groq = ChatGroq(temperature=0.3, model="llama-3.1-70b-versatile")
-lead = LeadGPT(
+llm_groq = ChatGroq(temperature=0.3, model="llama-3.1-70b-versatile", streaming=True)
+stage_classifier = (
+    StageClassifier.load(STAGE_CLASSIFIER_PATH, STAGE_CLASSIFIER_THRESHOLD)
+    if os.path.exists(STAGE_CLASSIFIER_PATH)
+    else None
+)
+llm_cache = get_llm_response_cache() if LLM_CACHE_CHAINS else None
+turn_planner_stats = TurnPlannerStats() if TURN_PLANNER_ENABLED else None
+# Filled in (and refreshed on reload) by the policy store manager
+faq_matcher = get_faq_matcher() if FAQ_FAST_PATH_ENABLED else None
+lead_factory = partial(
+    LeadGPT,
     llm=llm_groq,
     verbose=True,
     lead_name="DaisyBot",
@@ -39,25 +81,102 @@ lead = LeadGPT(
     conversation_purpose="Provide product information and understand customer needs",
     conversation_type="Chat and messaging",
     languages="Vietnamese",
+    turn_planner=TURN_PLANNER_ENABLED,
+    turn_planner_stats=turn_planner_stats,
+    stage_classifier=stage_classifier,
+    stage_log_path=STAGE_LOG_PATH,
+    llm_cache=llm_cache,
+    cached_chains=LLM_CACHE_CHAINS,
+    faq_matcher=faq_matcher,
+)
+sessions = SessionRegistry(
+    lead_factory,
+    max_sessions=SESSION_MAX_COUNT,
+    ttl_seconds=SESSION_TTL_SECONDS,
+    max_memory_bytes=int(SESSION_MAX_MEMORY_MB * 1024 * 1024),
 )
 
+@app.on_event("startup")
+async def load_policy_store():
+    # Load the FAISS index before the first request instead of on the request path
+    await asyncio.to_thread(get_vector_store_manager)
+
+@app.on_event("startup")
+async def load_product_catalog():
+    if PRODUCT_COLUMNAR_ENGINE_ENABLED:
+        await asyncio.to_thread(get_columnar_catalog, DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE)
+
 class Message(BaseModel):
     content: str
+    session_id: Optional[str] = None
 
 @app.post("/chat")
-async def chat(message: Message):
+async def chat(message: Message, x_session_id: Optional[str] = Header(default=None)):
+    session_id = x_session_id or message.session_id or uuid.uuid4().hex
     try:
-        lead.human_step(message.content)
-        lead.determine_conversation_stage()
-        lead.update_customer_info()
-        response = lead.agent_step()
+        lead = sessions.get(session_id)
+        async with sessions.lock(session_id):
+            try:
+                response = await lead.aprocess_turn(message.content)
+            finally:
+                # The turn added messages: count them towards the memory budget now
+                sessions.touch(session_id)
         # Parse the JSON response
-        return {"response": response}
+        return {"response": response, "session_id": session_id}
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Invalid JSON response from agent")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(message: Message, x_session_id: Optional[str] = Header(default=None)):
+    """Server-Sent Events version of /chat: stage, tool_start, tool_end, token, done."""
+    session_id = x_session_id or message.session_id or uuid.uuid4().hex
+
+    async def event_stream():
+        async with sessions.lock(session_id):
+            try:
+                # Inside the try so registry errors reach the client as an SSE error event
+                lead = sessions.get(session_id)
+                async for event in lead.astream_turn(message.content):
+                    data = json.dumps(event["data"], ensure_ascii=False)
+                    yield f"event: {event['event']}\ndata: {data}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps(str(e), ensure_ascii=False)}\n\n"
+            finally:
+                sessions.touch(session_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"X-Session-Id": session_id, "Cache-Control": "no-cache"},
+    )
+
+@app.delete("/chat/{session_id}")
+async def end_chat(session_id: str):
+    sessions.pop(session_id)
+    return {"session_id": session_id}
+
+@app.get("/stats")
+async def stats():
+    product_filter_parser = (
+        get_product_filter_parser(DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE) if PRODUCT_FILTER_PARSER_ENABLED else None
+    )
+    return {
+        "sessions": sessions.stats(),
+        "stage_classifier": stage_classifier.stats() if stage_classifier else None,
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "faq_fast_path": faq_matcher.stats() if faq_matcher else None,
+        "turn_planner": turn_planner_stats.stats() if turn_planner_stats else None,
+        "product_db": get_connection_pool(DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE).stats(),
+        "product_filter": product_filter_parser.stats() if product_filter_parser else None,
+        "product_sql_templates": get_sql_template_cache().stats() if PRODUCT_SQL_TEMPLATE_CACHE_ENABLED else None,
+        "product_columnar": (
+            get_columnar_catalog(DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE).stats() if PRODUCT_COLUMNAR_ENGINE_ENABLED else None
+        ),
+        "product_sql_guard": get_sql_guard().stats() if PRODUCT_SQL_GUARD_ENABLED else None,
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -4,7 +4,7 @@ from typing import Any, Dict, Optional, List
 
 # Corrected import path for RunnableConfig
 from langchain.agents import AgentExecutor
-from langchain.callbacks.manager import CallbackManager
+from langchain.callbacks.manager import AsyncCallbackManager, CallbackManager
 from langchain.chains.base import Chain
 from langchain_core.load.dump import dumpd
 from langchain_core.outputs import RunInfo
@@ -57,18 +57,7 @@ class CustomAgentExecutor(AgentExecutor):
                 else self._call(inputs)
             )
             # Capture all intermediate steps
-            if "intermediate_steps" in outputs:
-                for step in outputs["intermediate_steps"]:
-                    if isinstance(step, tuple) and len(step) == 2:
-                        action, observation = step
-                        intermediate_steps.append({
-                            "thought": action.log,
-                            "action": action.tool,
-                            "action_input": action.tool_input,
-                            "observation": observation
-                        })
-                    else:
-                        intermediate_steps.append(step)
+            intermediate_steps.extend(self._capture_intermediate_steps(outputs))
         except BaseException as e:
             # Handle errors and capture them as intermediate steps
             run_manager.on_chain_error(e)
@@ -82,6 +71,81 @@ class CustomAgentExecutor(AgentExecutor):
         final_outputs: Dict[str, Any] = self.prep_outputs(
             inputs, outputs, return_only_outputs
         )
+        return self._finalize_outputs(final_outputs, intermediate_steps, run_manager, include_run_info)
+
+    async def ainvoke(
+        self,
+        input: Dict[str, Any],
+        config: Optional[RunnableConfig] = None,
+        **kwargs: Any,
+    ) -> Dict[str, Any]:
+        intermediate_steps = []
+
+        config = ensure_config(config)
+        callbacks = config.get("callbacks")
+        tags = config.get("tags")
+        metadata = config.get("metadata")
+        run_name = config.get("run_name")
+        include_run_info = kwargs.get("include_run_info", False)
+        return_only_outputs = kwargs.get("return_only_outputs", False)
+
+        inputs = await self.aprep_inputs(input)
+        callback_manager = AsyncCallbackManager.configure(
+            callbacks,
+            self.callbacks,
+            self.verbose,
+            tags,
+            self.tags,
+            metadata,
+            self.metadata,
+        )
+
+        new_arg_supported = inspect.signature(self._acall).parameters.get("run_manager")
+        run_manager = await callback_manager.on_chain_start(
+            dumpd(self),
+            inputs,
+            name=run_name,
+        )
+
+        try:
+            outputs = (
+                await self._acall(inputs, run_manager=run_manager)
+                if new_arg_supported
+                else await self._acall(inputs)
+            )
+            intermediate_steps.extend(self._capture_intermediate_steps(outputs))
+        except BaseException as e:
+            await run_manager.on_chain_error(e)
+            raise e
+        await run_manager.on_chain_end(outputs)
+
+        final_outputs: Dict[str, Any] = await self.aprep_outputs(
+            inputs, outputs, return_only_outputs
+        )
+        return self._finalize_outputs(final_outputs, intermediate_steps, run_manager, include_run_info)
+
+    def _capture_intermediate_steps(self, outputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        captured = []
+        for step in outputs.get("intermediate_steps", []):
+            if isinstance(step, tuple) and len(step) == 2:
+                action, observation = step
+                captured.append({
+                    "thought": action.log,
+                    "action": action.tool,
+                    "action_input": action.tool_input,
+                    "observation": observation
+                })
+            else:
+                captured.append(step)
+        return captured
+
+    def _finalize_outputs(
+        self,
+        final_outputs: Dict[str, Any],
+        intermediate_steps: List[Dict[str, Any]],
+        run_manager: Any,
+        include_run_info: bool,
+    ) -> Dict[str, Any]:
         if include_run_info:
             final_outputs["run_info"] = RunInfo(run_id=run_manager.run_id)
 
@@ -1,14 +1,25 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any
 import json
+from typing import AsyncIterator, List, Optional, Tuple
 from pprint import pprint
 
 from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
 from langchain.agents.agent import AgentExecutor
 
 from leadgpt.assistant.lead_assistant import StageAnalyzerAssistant
+from leadgpt.assistant.stage_classifier import StageClassifier, append_stage_example
+from leadgpt.assistant.turn_planner import TurnPlan, TurnPlannerAssistant, TurnPlannerStats, parse_turn_plan
+from leadgpt.retrieval.faq import FAQMatcher
 from leadgpt.memory.summary import LeadSummaryMemory
+from leadgpt.memory.customer_info import format_customer_info
 from leadgpt.stage import LEAD_CONVERSATION_STAGES
+from leadgpt.llm_cache import cached_llm
 from leadgpt.agent.prompt import LEAD_AGENT_PROMPT
 from leadgpt.tools.policy_search import policy_search_tool
 from leadgpt.tools.product_search import product_search_tool
@@ -16,22 +27,38 @@ from leadgpt.agent.tool_prompt import CustomPromptTemplate
 from leadgpt.agent.excutor import CustomAgentExecutor
 from leadgpt.agent.create_lead_agent import create_lead_agent
 from leadgpt.agent.result_parser import parse_agent_result
+from leadgpt.agent.streaming import LeadStreamingCallbackHandler
 from langchain.agents import create_react_agent
 
+# Shared by all LeadGPT instances to run the independent pre-agent LLM calls side by side
+PRE_AGENT_EXECUTOR = ThreadPoolExecutor(thread_name_prefix="leadgpt-pre-agent")
+
 class LeadGPT:
     def __init__(self, llm, verbose=False, **kwargs):
         self.llm = llm
         self.verbose = verbose
         
+        # Deterministic chains can read/write an LLM response cache; the agent reply never does
+        llm_cache = kwargs.get("llm_cache")
+        cached_chains = kwargs.get("cached_chains", ("stage_analyzer", "summary"))
+        stage_analyzer_llm = cached_llm(llm, llm_cache) if "stage_analyzer" in cached_chains else llm
+        summary_llm = cached_llm(llm, llm_cache) if "summary" in cached_chains else llm
+
         self.current_stage_id = "1"  # Giữ nguyên là chuỗi
-        self.stage_analyzer_assistant = StageAnalyzerAssistant.from_llm(llm, verbose=verbose)
+        self.stage_analyzer_assistant = StageAnalyzerAssistant.from_llm(stage_analyzer_llm, verbose=verbose)
+        # Optional local classifier tried before the LLM analyzer, and a JSONL log of
+        # LLM decisions to train it from
+        self.stage_classifier: Optional[StageClassifier] = kwargs.get("stage_classifier")
+        self.stage_log_path: Optional[str] = kwargs.get("stage_log_path")
+        # Optional lookup that answers verbatim FAQ questions without the agent loop
+        self.faq_matcher: Optional[FAQMatcher] = kwargs.get("faq_matcher")
         
         self.chat_memory = ChatMessageHistory()
         self.human_chat_memory = []
         self.human_input = ""
         self.tools = [product_search_tool, policy_search_tool]  
         self.lead_summary_memory = LeadSummaryMemory(
-            llm=llm, 
+            llm=summary_llm, 
             chat_memory=self.chat_memory,
             verbose=verbose
         )
@@ -46,6 +73,14 @@ class LeadGPT:
         self.conversation_type = kwargs.get("conversation_type", "conversation_type")
         self.languages = kwargs.get("languages", "Vietnamese")
         self.customer_info = None
+        # Number of chat messages already folded into customer_info
+        self.summarized_message_count = 0
+        self._lead_agent_executor: Optional[CustomAgentExecutor] = None
+
+        # Opt-in single-call mode: one structured call plans stage, customer info and reply
+        self.turn_planner = TurnPlannerAssistant.from_llm(llm, verbose=verbose) if kwargs.get("turn_planner") else None
+        # Pass one TurnPlannerStats to every session to count turns process-wide
+        self.turn_planner_stats: TurnPlannerStats = kwargs.get("turn_planner_stats") or TurnPlannerStats()
         
         
     @property
@@ -56,34 +91,84 @@ class LeadGPT:
     def human_step(self, message: str):
         self.human_input = message
         self.chat_memory.add_user_message(self.human_input)
+
+    async def ahuman_step(self, message: str):
+        self.human_step(message)
         
         
+    def _stage_analyzer_inputs(self) -> Dict[str, Any]:
+        return {
+            "current_conversation_stage": self.current_conversation_stage,
+            "conversation_history": self.chat_memory.messages[-10:],
+            "current_stage_id": self.current_stage_id,
+            "customer_information": self.lead_summary_memory.buffer
+        }
+
+    def _stage_history(self) -> List[str]:
+        return [f"{msg.type}: {msg.content}" for msg in self.chat_memory.messages[-10:]]
+
+    def _classify_stage(self) -> Optional[str]:
+        if self.stage_classifier is None:
+            return None
+        stage_id = self.stage_classifier.classify(self._stage_history(), self.current_stage_id)
+        if stage_id is not None:
+            self.current_stage_id = stage_id
+        return stage_id
+
+    def _set_stage(self, stage_analyzer_output: Dict[str, Any]) -> str:
+        previous_stage_id = self.current_stage_id
+        self.current_stage_id = stage_analyzer_output.get("text", "1").strip()  
+        # print(f"Current Conversation Stage: {self.current_stage_id} : {self.current_conversation_stage}")
+        if self.stage_log_path:
+            append_stage_example(self.stage_log_path, self._stage_history(), previous_stage_id, self.current_stage_id)
+        return self.current_conversation_stage
+
     def determine_conversation_stage(self):   
+        if self._classify_stage() is not None:
+            return self.current_conversation_stage
         stage_analyzer_output = self.stage_analyzer_assistant.invoke(   
-            input={
-                "current_conversation_stage": self.current_conversation_stage,
-                "conversation_history": self.chat_memory.messages[-10:],
-                "current_stage_id": self.current_stage_id,
-                "customer_information": self.lead_summary_memory.buffer
-            },
+            input=self._stage_analyzer_inputs(),
             return_only_outputs=True,
         )
-        self.current_stage_id = stage_analyzer_output.get("text", "1").strip()  
-        # print(f"Current Conversation Stage: {self.current_stage_id} : {self.current_conversation_stage}")
-        return self.current_conversation_stage
+        return self._set_stage(stage_analyzer_output)
+
+    async def adetermine_conversation_stage(self):
+        if self._classify_stage() is not None:
+            return self.current_conversation_stage
+        stage_analyzer_output = await self.stage_analyzer_assistant.ainvoke(
+            input=self._stage_analyzer_inputs(),
+            return_only_outputs=True,
+        )
+        return self._set_stage(stage_analyzer_output)
+
+    def _unsummarized_human_lines(self) -> Tuple[int, List[str]]:
+        """Human messages added since the last successful summary, with the new high-water mark."""
+        messages = self.chat_memory.messages
+        new_lines = [msg.content for msg in messages[self.summarized_message_count:] if msg.type == "human"]
+        return len(messages), new_lines
     
     def update_customer_info(self):
-        """Update the customer information based on recent conversation"""
+        """Update the customer information based on the messages not summarized yet"""
         # print(f"\nPrevious customer info: {self.customer_info}\n")
-        new_info = self.lead_summary_memory.predict_new_summary(
-            input={
-                "customer_info": self.customer_info,
-                "new_lines": [msg.content for msg in self.chat_memory.messages if msg.type == "human"][-4:]
-            }
+        high_water_mark, new_lines = self._unsummarized_human_lines()
+        if not new_lines:
+            return
+        self.customer_info = self.lead_summary_memory.predict_new_summary(
+            input={"customer_info": self.customer_info, "new_lines": new_lines}
         )
-        self.customer_info = new_info
+        self.summarized_message_count = high_water_mark
         # print(f"Updated customer info: {self.customer_info}\n")
 
+    async def aupdate_customer_info(self):
+        """Async version of update_customer_info"""
+        high_water_mark, new_lines = self._unsummarized_human_lines()
+        if not new_lines:
+            return
+        self.customer_info = await self.lead_summary_memory.apredict_new_summary(
+            input={"customer_info": self.customer_info, "new_lines": new_lines}
+        )
+        self.summarized_message_count = high_water_mark
+
 
     def _prepare_inputs(self) -> Dict[str, Any]:
         return {
@@ -103,8 +188,7 @@ class LeadGPT:
             "customer_info_name": self.customer_info
         }
  
-    def agent_step(self):
-        inputs = self._prepare_inputs()
+    def _build_agent_executor(self) -> CustomAgentExecutor:
         prompt = CustomPromptTemplate(
             template=LEAD_AGENT_PROMPT,
             tools_getter=lambda x: self.tools,
@@ -127,7 +211,7 @@ class LeadGPT:
             ],
         )
         self.runable_lead_agent = create_lead_agent(self.llm, prompt)   
-        lead_agent = CustomAgentExecutor(
+        return CustomAgentExecutor(
             agent=self.runable_lead_agent,
             tools=self.tools,
             verbose=self.verbose,
@@ -135,12 +219,205 @@ class LeadGPT:
             return_intermediate_steps=True, 
             handle_parsing_errors=True
         )
-        result = lead_agent.invoke(inputs)
+
+    @property
+    def lead_agent_executor(self) -> CustomAgentExecutor:
+        """Prompt, agent and executor are built on first use and reused every turn;
+        only the inputs from _prepare_inputs change between turns."""
+        if self._lead_agent_executor is None:
+            self._lead_agent_executor = self._build_agent_executor()
+        return self._lead_agent_executor
+
+    def _finish_agent_step(self, result: Dict[str, Any]) -> str:
         self.chat_memory.add_ai_message(result.get("output"))
         
         parsed_result = parse_agent_result(result, self.customer_info, self.current_stage_id, self.current_conversation_stage)
         print(parsed_result)
         return parsed_result
+ 
+    def agent_step(self):
+        inputs = self._prepare_inputs()
+        result = self.lead_agent_executor.invoke(inputs)
+        return self._finish_agent_step(result)
 
-    
-    
\ No newline at end of file
+    async def aagent_step(self, callbacks: Optional[List[BaseCallbackHandler]] = None):
+        inputs = self._prepare_inputs()
+        result = await self.lead_agent_executor.ainvoke(inputs, config={"callbacks": callbacks})
+        return self._finish_agent_step(result)
+
+    def _turn_planner_inputs(self) -> Dict[str, Any]:
+        return {
+            "leadAI_name": self.lead_name,
+            "leadAI_role": self.lead_role,
+            "company_name": self.company_name,
+            "company_business": self.company_business,
+            "conversation_purpose": self.conversation_purpose,
+            "languages": self.languages,
+            "conversation_stages": "\n".join(f'"{stage_id}": {stage}' for stage_id, stage in LEAD_CONVERSATION_STAGES.items()),
+            "tools": "\n".join(f"{tool.name}: {tool.description}" for tool in self.tools),
+            "tool_names": ", ".join(tool.name for tool in self.tools),
+            "current_stage_id": self.current_stage_id,
+            "current_conversation_stage": self.current_conversation_stage,
+            "customer_information": self.customer_info,
+            "conversation_history": "\n".join(f"{msg.type}: {msg.content}" for msg in self.chat_memory.messages[-10:]),
+            "input": self.human_input,
+        }
+
+    def _apply_turn_plan(self, planner_output: Dict[str, Any]) -> Optional[TurnPlan]:
+        """Validate the planner output and apply stage and customer info; None means fall back."""
+        try:
+            plan = parse_turn_plan(planner_output.get("text", ""), [tool.name for tool in self.tools])
+        except OutputParserException:
+            self.turn_planner_stats.record(planned=False)
+            return None
+        self.turn_planner_stats.record(planned=True)
+        self.current_stage_id = plan.stage_id
+        self.customer_info = format_customer_info(plan.customer_info)
+        self.summarized_message_count = len(self.chat_memory.messages)
+        return plan
+
+    def _planned_action(self, plan: TurnPlan) -> AgentAction:
+        return AgentAction(
+            tool=plan.action.tool,
+            tool_input=plan.action.tool_input,
+            log=f"Thought: Do i need to use a tool? Yes\nAction: {plan.action.tool}\nAction Input: {plan.action.tool_input}",
+        )
+
+    def _planned_result(self, output: str, steps: List[Any]) -> Dict[str, Any]:
+        """Shape a planned turn like a CustomAgentExecutor result for parse_agent_result."""
+        intermediate_steps = self.lead_agent_executor._capture_intermediate_steps({"intermediate_steps": steps})
+        return {
+            "output": output,
+            "intermediate_steps": intermediate_steps,
+            "log": self.lead_agent_executor._format_log_to_string(intermediate_steps),
+        }
+
+    def _run_turn_plan(self, plan: TurnPlan) -> Optional[Dict[str, Any]]:
+        if plan.reply:
+            return self._planned_result(f"Thought: Do i need to use a tool? No.\n{self.lead_name}: {plan.reply}", [])
+        # Run the planned tool, then let the agent answer from that observation in one LLM call
+        action = self._planned_action(plan)
+        tool = next(tool for tool in self.tools if tool.name == action.tool)
+        steps = [(action, tool.run(action.tool_input))]
+        decision = self.lead_agent_executor.agent.plan(steps, **self._prepare_inputs())
+        if not isinstance(decision, AgentFinish):
+            return None
+        return self._planned_result(decision.return_values["output"], steps)
+
+    async def _arun_turn_plan(
+        self, plan: TurnPlan, callbacks: Optional[List[BaseCallbackHandler]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if plan.reply:
+            return self._planned_result(f"Thought: Do i need to use a tool? No.\n{self.lead_name}: {plan.reply}", [])
+        action = self._planned_action(plan)
+        tool = next(tool for tool in self.tools if tool.name == action.tool)
+        steps = [(action, await tool.arun(action.tool_input, callbacks=callbacks))]
+        decision = await self.lead_agent_executor.agent.aplan(steps, callbacks=callbacks, **self._prepare_inputs())
+        if not isinstance(decision, AgentFinish):
+            return None
+        return self._planned_result(decision.return_values["output"], steps)
+
+    async def _astream_agent_step(
+        self, plan: Optional[TurnPlan], handler: LeadStreamingCallbackHandler
+    ) -> str:
+        """Agent step of astream_turn: the planned action if there is one, else the agent."""
+        if plan is not None:
+            result = await self._arun_turn_plan(plan, callbacks=[handler])
+            if result:
+                if plan.reply:
+                    # A planned reply makes no LLM call, so there are no tokens to relay
+                    await handler.emit("token", plan.reply)
+                return self._finish_agent_step(result)
+        return await self.aagent_step(callbacks=[handler])
+
+    def _faq_result(self, message: str) -> Optional[Dict[str, Any]]:
+        """Answer a (near) verbatim FAQ question directly; stage and customer info are left as they are."""
+        if self.faq_matcher is None:
+            return None
+        match = self.faq_matcher.match(message)
+        if match is None:
+            return None
+        # parse_agent_result reads the reply up to the first newline, so keep it on one line
+        answer = " ".join(match.answer.split())
+        return self._planned_result(f"Thought: Do i need to use a tool? No.\n{self.lead_name}: {answer}", [])
+
+    def process_turn(self, message: str):
+        """Run one full turn for a customer message.
+
+        Stage analysis and customer info extraction do not read each other's output,
+        so both LLM calls run concurrently before the agent step. With turn_planner
+        enabled a single structured call is tried first, falling back to this path
+        when its output is malformed. Messages matching a FAQ question skip all of it.
+        """
+        self.human_step(message)
+        faq_result = self._faq_result(message)
+        if faq_result:
+            return self._finish_agent_step(faq_result)
+        if self.turn_planner is not None:
+            plan = self._apply_turn_plan(self.turn_planner.invoke(self._turn_planner_inputs()))
+            if plan is not None:
+                # Stage and customer info are already set; only the reply may still need the agent
+                result = self._run_turn_plan(plan)
+                return self._finish_agent_step(result) if result else self.agent_step()
+        stage_future = PRE_AGENT_EXECUTOR.submit(self.determine_conversation_stage)
+        info_future = PRE_AGENT_EXECUTOR.submit(self.update_customer_info)
+        stage_future.result()
+        info_future.result()
+        return self.agent_step()
+
+    async def aprocess_turn(self, message: str):
+        """Async version of process_turn"""
+        await self.ahuman_step(message)
+        faq_result = self._faq_result(message)
+        if faq_result:
+            return self._finish_agent_step(faq_result)
+        if self.turn_planner is not None:
+            plan = self._apply_turn_plan(await self.turn_planner.ainvoke(self._turn_planner_inputs()))
+            if plan is not None:
+                result = await self._arun_turn_plan(plan)
+                return self._finish_agent_step(result) if result else await self.aagent_step()
+        await asyncio.gather(
+            self.adetermine_conversation_stage(),
+            self.aupdate_customer_info(),
+        )
+        return await self.aagent_step()
+
+    async def astream_turn(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Run one turn like aprocess_turn, yielding typed events as they happen.
+
+        Emits "stage" once the stage is decided (by the turn planner when enabled),
+        "tool_start"/"tool_end" around tool calls, "token" for each piece of the final
+        answer and "done" with the same JSON payload agent_step returns.
+        """
+        await self.ahuman_step(message)
+        faq_result = self._faq_result(message)
+        if faq_result:
+            yield {"event": "token", "data": faq_result["output"].split(f"{self.lead_name}: ", 1)[1]}
+            yield {"event": "done", "data": json.loads(self._finish_agent_step(faq_result))}
+            return
+        plan = None
+        if self.turn_planner is not None:
+            plan = self._apply_turn_plan(await self.turn_planner.ainvoke(self._turn_planner_inputs()))
+        if plan is None:
+            await asyncio.gather(
+                self.adetermine_conversation_stage(),
+                self.aupdate_customer_info(),
+            )
+        yield {
+            "event": "stage",
+            "data": {
+                "current_stage_id": self.current_stage_id,
+                "current_conversation_stage": self.current_conversation_stage,
+                "customer_information": self.customer_info,
+            },
+        }
+
+        handler = LeadStreamingCallbackHandler(self.lead_name)
+        agent_task = asyncio.ensure_future(self._astream_agent_step(plan, handler))
+        try:
+            async for event in handler.aiter_events(agent_task):
+                yield event
+        finally:
+            if not agent_task.done():
+                agent_task.cancel()
+        yield {"event": "done", "data": json.loads(agent_task.result())}
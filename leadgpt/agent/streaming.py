@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+
+class LeadStreamingCallbackHandler(AsyncCallbackHandler):
+    """Turn the agent's callbacks into typed events on an asyncio queue.
+
+    Events are dicts of the form {"event": <type>, "data": <payload>}:
+    - tool_start / tool_end: a tool call started or finished
+    - token: a piece of the final answer (text after "<lead_name>:")
+
+    The agent LLM must stream (e.g. `streaming=True`) for tokens to arrive one by one.
+    """
+
+    def __init__(self, lead_name: str):
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.answer_prefix = f"{lead_name}:"
+        self._buffers: Dict[UUID, str] = {}
+        # run_id -> whether any answer token was emitted yet
+        self._answering: Dict[UUID, bool] = {}
+        self._tool_names: Dict[UUID, str] = {}
+
+    async def emit(self, event: str, data: Any) -> None:
+        await self.queue.put({"event": event, "data": data})
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id in self._answering:
+            # Drop the whitespace between the prefix and the first word of the answer
+            if not self._answering[run_id]:
+                token = token.lstrip()
+            if token:
+                self._answering[run_id] = True
+                await self.emit("token", token)
+            return
+        # Hold back the "Thought: ..." part until the answer prefix shows up
+        buffer = self._buffers.get(run_id, "") + token
+        self._buffers[run_id] = buffer
+        index = buffer.find(self.answer_prefix)
+        if index >= 0:
+            self._answering[run_id] = False
+            await self.on_llm_new_token(buffer[index + len(self.answer_prefix):], run_id=run_id)
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._buffers.pop(run_id, None)
+        self._answering.pop(run_id, None)
+
+    async def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        name = serialized.get("name", "")
+        self._tool_names[run_id] = name
+        await self.emit("tool_start", {"tool": name, "input": input_str})
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self._tool_names.pop(run_id, "")
+        await self.emit("tool_end", {"tool": name, "output": str(output)})
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        name = self._tool_names.pop(run_id, "")
+        await self.emit("tool_end", {"tool": name, "error": str(error)})
+
+    async def aiter_events(self, task: "asyncio.Future") -> AsyncIterator[Dict[str, Any]]:
+        """Yield queued events until `task` (the agent run) is finished."""
+        while True:
+            get_event: Optional[asyncio.Future] = asyncio.ensure_future(self.queue.get())
+            done, _ = await asyncio.wait({get_event, task}, return_when=asyncio.FIRST_COMPLETED)
+            if get_event in done:
+                yield get_event.result()
+                continue
+            get_event.cancel()
+            while not self.queue.empty():
+                yield self.queue.get_nowait()
+            return
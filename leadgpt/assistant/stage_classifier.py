@@ -0,0 +1,185 @@
+import argparse
+import json
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from leadgpt.stage import LEAD_CONVERSATION_STAGES
+from leadgpt.text import TOKEN_PATTERN
+
+STAGE_IDS = sorted(LEAD_CONVERSATION_STAGES)
+
+_log_lock = threading.Lock()
+
+
+def allowed_stages(current_stage_id: str) -> List[str]:
+    """Stages reachable from the current one (same rules as the LLM analyzer prompt)."""
+    current = int(current_stage_id) if current_stage_id in STAGE_IDS else 1
+    allowed = {current, min(current + 1, len(STAGE_IDS))}
+    if current in (3, 4):
+        allowed.update((3, 4))
+    return [str(stage) for stage in sorted(allowed)]
+
+
+def append_stage_example(path: str, conversation_history: Sequence[str], current_stage_id: str, stage_id: str) -> None:
+    """Log one analyzer decision as a JSONL training example for StageClassifier."""
+    record = {
+        "conversation_history": list(conversation_history),
+        "current_stage_id": current_stage_id,
+        "stage_id": stage_id,
+    }
+    with _log_lock, open(path, "a", encoding="utf8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def load_stage_examples(path: str) -> List[Dict]:
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class StageClassifier:
+    """Local conversation stage classifier: hashed n-gram features + softmax regression.
+
+    Predictions are restricted to the stages reachable from the current one. When the
+    best probability is below `confidence_threshold`, `classify` returns None so the
+    caller can fall back to the LLM StageAnalyzerAssistant.
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2 ** 14,
+        confidence_threshold: float = 0.8,
+        weights: Optional[np.ndarray] = None,
+        bias: Optional[np.ndarray] = None,
+    ):
+        self.n_features = n_features
+        self.confidence_threshold = confidence_threshold
+        self.weights = weights if weights is not None else np.zeros((n_features, len(STAGE_IDS)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(STAGE_IDS), dtype=np.float32)
+        self.predictions = 0
+        self.fallbacks = 0
+
+    # Features
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        h = zlib.crc32(feature.encode("utf8"))
+        return h % self.n_features, (1.0 if h & 0x80000000 else -1.0)
+
+    def featurize(self, conversation_history: Sequence[str], current_stage_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse (indices, values) features of the recent history and the current stage."""
+        features = [f"stage={current_stage_id}", "bias"]
+        for distance, line in enumerate(reversed(conversation_history[-6:])):
+            role, _, text = line.partition(": ")
+            # The latest messages matter most, older ones share one bucket
+            scope = f"{role}{distance}" if distance < 2 else "hist"
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            features.extend(f"{scope}:{token}" for token in tokens)
+            features.extend(f"{scope}:{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+            features.append(f"{scope}:stage={current_stage_id}")
+        values: Dict[int, float] = {}
+        for feature in features:
+            index, sign = self._hash(feature)
+            values[index] = values.get(index, 0.0) + sign
+        idx = np.fromiter(values.keys(), dtype=np.int64, count=len(values))
+        val = np.fromiter(values.values(), dtype=np.float32, count=len(values))
+        return idx, val / np.sqrt(len(features))
+
+    # Inference
+
+    def predict_proba(self, conversation_history: Sequence[str], current_stage_id: str) -> np.ndarray:
+        idx, val = self.featurize(conversation_history, current_stage_id)
+        logits = val @ self.weights[idx] + self.bias
+        allowed = allowed_stages(current_stage_id)
+        mask = np.array([stage in allowed for stage in STAGE_IDS])
+        logits = np.where(mask, logits, -np.inf)
+        exp = np.exp(logits - logits.max())
+        return exp / exp.sum()
+
+    def predict(self, conversation_history: Sequence[str], current_stage_id: str) -> Tuple[str, float]:
+        proba = self.predict_proba(conversation_history, current_stage_id)
+        best = int(proba.argmax())
+        return STAGE_IDS[best], float(proba[best])
+
+    def classify(self, conversation_history: Sequence[str], current_stage_id: str) -> Optional[str]:
+        """Return the stage id if confident enough, otherwise None (use the LLM analyzer)."""
+        stage_id, confidence = self.predict(conversation_history, current_stage_id)
+        self.predictions += 1
+        if confidence < self.confidence_threshold:
+            self.fallbacks += 1
+            return None
+        return stage_id
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallbacks / self.predictions if self.predictions else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"predictions": self.predictions, "fallbacks": self.fallbacks, "fallback_rate": self.fallback_rate}
+
+    # Training
+
+    def fit(self, examples: Iterable[Dict], epochs: int = 10, learning_rate: float = 0.5, l2: float = 1e-4, seed: int = 0) -> "StageClassifier":
+        """Train on logged examples ({"conversation_history", "current_stage_id", "stage_id"}) with SGD."""
+        data = [
+            (*self.featurize(example["conversation_history"], example["current_stage_id"]),
+             STAGE_IDS.index(str(example["stage_id"]).strip()))
+            for example in examples
+        ]
+        rng = np.random.default_rng(seed)
+        for _ in range(epochs):
+            for i in rng.permutation(len(data)):
+                idx, val, label = data[i]
+                logits = val @ self.weights[idx] + self.bias
+                exp = np.exp(logits - logits.max())
+                grad = exp / exp.sum()
+                grad[label] -= 1.0
+                self.weights[idx] -= learning_rate * (np.outer(val, grad) + l2 * self.weights[idx])
+                self.bias -= learning_rate * grad
+        return self
+
+    def accuracy(self, examples: Iterable[Dict]) -> float:
+        examples = list(examples)
+        correct = sum(
+            self.predict(example["conversation_history"], example["current_stage_id"])[0] == str(example["stage_id"]).strip()
+            for example in examples
+        )
+        return correct / len(examples) if examples else 0.0
+
+    # Persistence
+
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            confidence_threshold=self.confidence_threshold,
+        )
+
+    @classmethod
+    def load(cls, path: str, confidence_threshold: Optional[float] = None) -> "StageClassifier":
+        data = np.load(path)
+        weights = data["weights"]
+        return cls(
+            n_features=weights.shape[0],
+            confidence_threshold=float(data["confidence_threshold"]) if confidence_threshold is None else confidence_threshold,
+            weights=weights,
+            bias=data["bias"],
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local stage classifier from logged analyzer decisions.")
+    parser.add_argument("examples", help="JSONL file written by append_stage_example")
+    parser.add_argument("output", help="Where to save the model (.npz)")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    examples = load_stage_examples(args.examples)
+    split = int(len(examples) * 0.9)
+    classifier = StageClassifier(confidence_threshold=args.threshold).fit(examples[:split], epochs=args.epochs)
+    print(f"Trained on {split} examples, held-out accuracy: {classifier.accuracy(examples[split:]):.2%}")
+    classifier = StageClassifier(confidence_threshold=args.threshold).fit(examples, epochs=args.epochs)
+    classifier.save(args.output)
@@ -0,0 +1,103 @@
+import json
+import threading
+from typing import Dict, List, Optional
+
+from langchain.chains.llm import LLMChain
+from langchain.prompts import PromptTemplate
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.pydantic_v1 import BaseModel, ValidationError
+
+from leadgpt.assistant.prompt import TURN_PLANNER_PROMPT
+from leadgpt.memory.customer_info import CUSTOMER_INFO_FIELDS
+from leadgpt.stage import LEAD_CONVERSATION_STAGES
+
+
+class PlannedAction(BaseModel):
+    tool: str
+    tool_input: str
+
+
+class TurnPlan(BaseModel):
+    """Structured output of the turn planner: next stage, customer fields and one move."""
+
+    stage_id: str
+    customer_info: Dict[str, Optional[str]]
+    action: Optional[PlannedAction] = None
+    reply: Optional[str] = None
+
+
+class TurnPlannerStats:
+    """Planned vs fallback turn counts, shared by every session so /stats can report them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.planned = 0
+        self.fallback = 0
+
+    def record(self, planned: bool) -> None:
+        with self._lock:
+            if planned:
+                self.planned += 1
+            else:
+                self.fallback += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            turns = self.planned + self.fallback
+            return {
+                "planned": self.planned,
+                "fallback": self.fallback,
+                "planned_rate": self.planned / turns if turns else 0.0,
+            }
+
+
+def parse_turn_plan(text: str, tool_names: List[str]) -> TurnPlan:
+    """Parse and validate the planner output, raising OutputParserException if malformed."""
+    cleaned = text.replace("```json", "").replace("```", "").strip()
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if start < 0 or end < start:
+        raise OutputParserException(f"Turn plan is not a JSON object: {text}")
+    try:
+        plan = TurnPlan.parse_obj(json.loads(cleaned[start:end + 1]))
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise OutputParserException(f"Invalid turn plan: {e}") from e
+
+    plan.stage_id = plan.stage_id.strip()
+    if plan.stage_id not in LEAD_CONVERSATION_STAGES:
+        raise OutputParserException(f"Unknown stage id in turn plan: {plan.stage_id}")
+    unknown_fields = set(plan.customer_info) - set(CUSTOMER_INFO_FIELDS)
+    if unknown_fields:
+        raise OutputParserException(f"Unknown customer fields in turn plan: {unknown_fields}")
+    if (plan.action is None) == (not plan.reply):
+        raise OutputParserException("Turn plan must contain exactly one of action or reply")
+    if plan.action is not None and plan.action.tool not in tool_names:
+        raise OutputParserException(f"Unknown tool in turn plan: {plan.action.tool}")
+    return plan
+
+
+class TurnPlannerAssistant(LLMChain):
+    """Assistant that plans a whole turn (stage, customer info, tool or reply) in one call."""
+
+    @classmethod
+    def from_llm(cls, llm: BaseLanguageModel, verbose: bool = False) -> LLMChain:
+        prompt = PromptTemplate(
+            template=TURN_PLANNER_PROMPT,
+            input_variables=[
+                "leadAI_name",
+                "leadAI_role",
+                "company_name",
+                "company_business",
+                "conversation_purpose",
+                "languages",
+                "conversation_stages",
+                "tools",
+                "tool_names",
+                "current_stage_id",
+                "current_conversation_stage",
+                "customer_information",
+                "conversation_history",
+                "input",
+            ],
+        )
+        return cls(prompt=prompt, llm=llm, verbose=verbose)
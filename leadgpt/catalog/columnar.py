@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from leadgpt.catalog.filters import ProductFilter
+from leadgpt.catalog.fts import fold_text
+from leadgpt.catalog.pool import get_connection_pool
+from leadgpt.text import TOKEN_PATTERN
+
+COLUMNS = ["product_code", "product_name", "material", "size", "color", "brand", "gender", "stock_quantity", "price"]
+# Rows are scanned in price order in growing chunks, stopping once `limit` matches are found
+FIRST_CHUNK_ROWS = 4096
+
+
+class Bitset:
+    """Multi-valued column as one bit per distinct value: "Xanh, Đen" sets the xanh and den bits."""
+
+    def __init__(self, column: Sequence, split: Callable[[object], Iterable[str]]):
+        # Catalog columns repeat a few distinct values, so split each distinct value once
+        distinct: Dict[object, int] = {}
+        codes = np.array([distinct.setdefault(value, len(distinct)) for value in column], dtype=np.int64)
+        values_per_code = [list(split(value)) for value in distinct]
+        self.positions: Dict[str, int] = {}
+        for values in values_per_code:
+            for value in values:
+                self.positions.setdefault(value, len(self.positions))
+        table = np.zeros((len(values_per_code), max(1, (len(self.positions) + 63) // 64)), dtype=np.uint64)
+        for code, values in enumerate(values_per_code):
+            for value in values:
+                position = self.positions[value]
+                table[code, position // 64] |= np.uint64(1 << (position % 64))
+        self.bits = table[codes] if len(codes) else np.zeros((0, table.shape[1]), dtype=np.uint64)
+
+    def _words(self, values: Iterable[str]) -> np.ndarray:
+        words = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for value in values:
+            position = self.positions[value]
+            words[position // 64] |= np.uint64(1 << (position % 64))
+        return words
+
+    def any_of(self, values: Iterable[str], rows: slice) -> np.ndarray:
+        """Rows having at least one of `values`."""
+        values = [value for value in values if value in self.positions]
+        if not values:
+            return np.zeros(rows.stop - rows.start, dtype=bool)
+        return ((self.bits[rows] & self._words(values)) != 0).any(axis=1)
+
+    def all_of(self, values: Iterable[str], rows: slice) -> np.ndarray:
+        """Rows having every one of `values`."""
+        if any(value not in self.positions for value in values):
+            return np.zeros(rows.stop - rows.start, dtype=bool)
+        words = self._words(values)
+        return ((self.bits[rows] & words) == words).all(axis=1)
+
+
+class ColumnarCatalog:
+    """Read-only product catalog held in NumPy column arrays, for ProductFilter searches.
+
+    Rows are sorted by price, so price bounds are a binary search and the cheapest matches
+    come first: filters are evaluated as vectorized masks over growing slices of rows until
+    `limit` rows match, and only those rows are turned into dicts. Results are the same as
+    `ProductFilter.to_sql()` on the SQLite database.
+    """
+
+    def __init__(self, rows: Sequence[Sequence]):
+        rows = sorted(rows, key=lambda row: row[COLUMNS.index("price")])
+        self.size = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        self.values = {name: np.array(column, dtype=object) for name, column in zip(COLUMNS, columns)}
+        self.price = np.array(columns[COLUMNS.index("price")], dtype=np.int64)
+        self.stock = np.array(columns[COLUMNS.index("stock_quantity")], dtype=np.int64)
+        self.gender_codes = {}
+        self.gender = self._codes(columns[COLUMNS.index("gender")], self.gender_codes)
+        self.brand_codes = {}
+        self.brand = self._codes(columns[COLUMNS.index("brand")], self.brand_codes)
+        # Unaccented, lowercase values, matching what the filter parser produces
+        self.colors = Bitset(columns[COLUMNS.index("color")], self._split)
+        self.sizes = Bitset(columns[COLUMNS.index("size")], self._split)
+        self.materials = Bitset(columns[COLUMNS.index("material")], self._words)
+        # Product-name terms match the name or the material, like the FTS5 {product_name material} filter
+        self.name_words = Bitset(
+            list(zip(columns[COLUMNS.index("product_name")], columns[COLUMNS.index("material")])),
+            lambda pair: self._words(pair[0]) | self._words(pair[1]),
+        )
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    @staticmethod
+    def _codes(values: Sequence, codes: Dict[object, int]) -> np.ndarray:
+        return np.array([codes.setdefault(value, len(codes)) for value in values], dtype=np.int32)
+
+    @staticmethod
+    def _split(value) -> List[str]:
+        return [fold_text(part.strip()) for part in str(value or "").split(",") if part.strip()]
+
+    @staticmethod
+    def _words(value) -> set:
+        return set(TOKEN_PATTERN.findall(fold_text(value)))
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "ColumnarCatalog":
+        return cls(conn.execute(f"SELECT {', '.join(COLUMNS)} FROM products").fetchall())
+
+    def _mask(self, product_filter: ProductFilter, rows: slice) -> np.ndarray:
+        mask = np.ones(rows.stop - rows.start, dtype=bool)
+        if product_filter.in_stock:
+            mask &= self.stock[rows] > 0
+        if product_filter.gender:
+            # Unisex products suit either gender
+            codes = [self.gender_codes[g] for g in (product_filter.gender, "Unisex") if g in self.gender_codes]
+            mask &= np.isin(self.gender[rows], codes)
+        if product_filter.brands:
+            mask &= np.isin(self.brand[rows], [self.brand_codes.get(brand, -1) for brand in product_filter.brands])
+        if product_filter.colors:
+            mask &= self.colors.any_of(product_filter.colors, rows)
+        if product_filter.sizes:
+            mask &= self.sizes.any_of(product_filter.sizes, rows)
+        if product_filter.materials:
+            mask &= self.materials.any_of(product_filter.materials, rows)
+        if product_filter.name_terms:
+            mask &= self.name_words.all_of(product_filter.name_terms, rows)
+        return mask
+
+    def search(self, product_filter: ProductFilter, limit: int = 20) -> List[Dict]:
+        """Up to `limit` matching products, cheapest first, as column -> value dicts."""
+        start_time = time.perf_counter()
+        low = 0 if product_filter.min_price is None else int(np.searchsorted(self.price, product_filter.min_price, "left"))
+        high = self.size if product_filter.max_price is None else int(np.searchsorted(self.price, product_filter.max_price, "right"))
+        matches: List[np.ndarray] = []
+        found, start, chunk = 0, low, FIRST_CHUNK_ROWS
+        while start < high and found < limit:
+            rows = slice(start, min(start + chunk, high))
+            indices = np.flatnonzero(self._mask(product_filter, rows)) + start
+            matches.append(indices)
+            found += len(indices)
+            start, chunk = rows.stop, chunk * 2
+        selected = np.concatenate(matches)[:limit] if matches else np.array([], dtype=np.int64)
+        results = [
+            {name: self.values[name][index] for name in COLUMNS}
+            for index in selected
+        ]
+        with self._lock:
+            self.searches += 1
+            self.search_seconds += time.perf_counter() - start_time
+        return results
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "rows": self.size,
+                "searches": self.searches,
+                "mean_search_us": self.search_seconds / self.searches * 1e6 if self.searches else 0.0,
+            }
+
+
+_catalogs: Dict[str, Tuple[object, ColumnarCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_columnar_catalog(db_path: str, immutable: bool = True) -> ColumnarCatalog:
+    """Process-wide in-memory copy of the catalog at `db_path`, loaded on first use.
+
+    Reloaded when the database file is replaced by a catalog refresh.
+    """
+    pool = get_connection_pool(db_path, immutable)
+    version = pool.file_version()
+    with _catalogs_lock:
+        if db_path not in _catalogs or _catalogs[db_path][0] != version:
+            _catalogs[db_path] = (version, ColumnarCatalog.from_connection(pool.connection()))
+        return _catalogs[db_path][1]
@@ -0,0 +1,302 @@
+import re
+import sqlite3
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain_core.pydantic_v1 import BaseModel
+
+from leadgpt.catalog.fts import FTS_TABLE, fold_text, has_search_index
+from leadgpt.catalog.pool import get_connection_pool
+from leadgpt.text import TOKEN_PATTERN
+
+# Comparison words (unaccented) that turn the following amount into a price bound
+MAX_PRICE_WORDS = ["duoi", "re hon", "nho hon", "it hon", "khong qua", "toi da", "under", "below", "less than", "<=", "<"]
+MIN_PRICE_WORDS = ["tren", "lon hon", "nhieu hon", "hon", "toi thieu", "tu", "over", "above", "more than", ">=", ">"]
+ABOUT_PRICE_WORDS = ["khoang", "tam", "around", "about", "~"]
+# "khoảng 500k" searches this far either side of the amount
+ABOUT_PRICE_MARGIN = 0.2
+GENDER_WORDS = {
+    "nam": "Nam", "men": "Nam", "male": "Nam",
+    "nu": "Nữ", "women": "Nữ", "female": "Nữ",
+    "unisex": "Unisex",
+}
+IN_STOCK_PHRASES = ["con hang", "co san", "san hang", "in stock"]
+# Filler words (unaccented) that carry no filter: "shop có áo sơ mi nào màu trắng không"
+STOPWORDS = {
+    "a", "anh", "ban", "cac", "can", "cho", "chi", "co", "cua", "di", "em", "gi", "gia", "hang", "hay", "hoac",
+    "kiem", "la", "loai", "mau", "minh", "mot", "mua", "muon", "nao", "nhe", "nha", "nhung",
+    "pham", "san", "shop", "size", "thi", "tim", "toi", "va", "vai", "voi", "xem",
+    "any", "buy", "find", "for", "i", "me", "need", "or", "please", "price", "show", "some", "the", "want",
+}
+# Negations ("áo không màu đen", "không muốn áo") need the LLM; "không"/"ko" closing a
+# question ("có áo len không") is only a question particle
+NEGATION_WORDS = {"khong", "ko", "k", "chang", "dung", "tru", "not", "no", "without", "except"}
+QUESTION_PARTICLES = {"khong", "ko", "k"}
+_AMOUNT = r"\d+(?:[.,]\d+)*\s*(?:k|nghin|ngan|tr|trieu|cu|d|vnd)?(?!\w)"
+AMOUNT_PATTERN = re.compile(r"(?P<number>\d+(?:[.,]\d+)*)\s*(?P<unit>k|nghin|ngan|tr|trieu|cu|d|vnd)?")
+RANGE_PATTERN = re.compile(rf"(?:tu|from|between)?\s*(?P<low>{_AMOUNT})\s*(?:-|den_?|toi|to|and)\s*(?P<high>{_AMOUNT})")
+SIZE_PATTERN = re.compile(r"\b(?:size|co)\s+(?P<size>\w+)")
+# Accented words that fold onto a filter word but mean something else ("năm" is not "nam",
+# "đến" is not "đen") are marked with this suffix so they never match the vocabulary
+AMBIGUOUS_SUFFIX = "_"
+
+
+def parse_amount(text: str) -> Optional[int]:
+    """Price in VND from an unaccented amount: "500k", "1.5tr", "2 triệu", "350.000", "350000d"."""
+    match = AMOUNT_PATTERN.fullmatch(text.strip())
+    if match is None:
+        return None
+    number, unit = match.group("number"), match.group("unit")
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number):
+        value = float(re.sub(r"[.,]", "", number))  # thousands separators
+    else:
+        value = float(number.replace(",", "."))
+    if unit in ("k", "nghin", "ngan"):
+        value *= 1_000
+    elif unit in ("tr", "trieu", "cu"):
+        value *= 1_000_000
+    elif value < 1_000:
+        # A bare small number is a size or a count, not a price
+        return None
+    return int(value)
+
+
+class ProductFilter(BaseModel):
+    """Structured product query produced by ProductFilterParser."""
+
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    colors: List[str] = []
+    sizes: List[str] = []
+    materials: List[str] = []
+    brands: List[str] = []
+    gender: Optional[str] = None
+    in_stock: bool = False
+    name_terms: List[str] = []
+
+    def match_expression(self) -> Optional[str]:
+        """FTS5 query for the text filters (values are unaccented words from the catalog)."""
+        parts = []
+        if self.name_terms:
+            # Words like "len" or "da" name both products ("Áo len") and materials
+            parts.append("{product_name material} : (" + " AND ".join(f'"{term}"' for term in self.name_terms) + ")")
+        for column, values in (("color", self.colors), ("size", self.sizes), ("material", self.materials)):
+            if values:
+                parts.append(f"{column} : (" + " OR ".join(f'"{value}"' for value in values) + ")")
+        return " AND ".join(parts) or None
+
+    def to_sql(self, limit: int = 20) -> Tuple[str, Tuple]:
+        """Parameterized query over products and the values to bind to it."""
+        conditions: List[str] = []
+        params: List = []
+        expression = self.match_expression()
+        if expression:
+            conditions.append(f"rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)")
+            params.append(expression)
+        if self.min_price is not None:
+            conditions.append("price >= ?")
+            params.append(self.min_price)
+        if self.max_price is not None:
+            conditions.append("price <= ?")
+            params.append(self.max_price)
+        if self.gender:
+            # Unisex products suit either gender
+            conditions.append("gender IN (?, 'Unisex')")
+            params.append(self.gender)
+        if self.brands:
+            conditions.append(f"brand IN ({', '.join('?' * len(self.brands))})")
+            params.extend(self.brands)
+        if self.in_stock:
+            conditions.append("stock_quantity > 0")
+        where = " AND ".join(conditions) or "1"
+        return f"SELECT * FROM products WHERE {where} ORDER BY price LIMIT {int(limit)}", tuple(params)
+
+
+class ProductFilterParser:
+    """Rule-based parser for simple product searches, built from the catalog's own values.
+
+    Recognizes price bounds and ranges, colors, sizes, materials, gender, brands, "còn hàng"
+    and product-name words, with or without diacritics. `parse` returns None as soon as a
+    word is left that it does not understand, so the caller falls back to LLM SQL generation
+    for anything beyond a plain filter.
+    """
+
+    def __init__(self, colors: Set[str], sizes: Set[str], materials: Set[str], brands: Set[str],
+                 name_words: Set[str], accented_words: Set[str]):
+        # Vocabularies are unaccented and lowercase, like the FTS5 table
+        self.colors = colors
+        self.sizes = sizes
+        self.materials = materials
+        self.brands = {fold_text(brand): brand for brand in brands}
+        self.name_words = name_words
+        # Accented spellings found in the catalog ("đen", "nữ", "áo"), to tell "đen" from "đến"
+        self.accented_words = accented_words
+        self._vocabulary = colors | materials | name_words | set(GENDER_WORDS) | {
+            word for color in colors for word in color.split()
+        }
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "ProductFilterParser":
+        rows = conn.execute("SELECT product_name, material, size, color, brand, gender FROM products").fetchall()
+
+        def values(column: int) -> Set[str]:
+            # Multi-valued columns are comma-separated: "Xanh, Đen", "S, M, L"
+            return {part.strip() for row in rows for part in str(row[column] or "").split(",") if part.strip()}
+
+        def words(texts) -> Set[str]:
+            return {word for text in texts for word in TOKEN_PATTERN.findall(fold_text(text))}
+
+        accented = {
+            word for column in (0, 1, 3, 5) for text in values(column)
+            for word in TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text.lower()))
+        }
+        return cls(
+            colors={fold_text(color) for color in values(3)},
+            sizes={fold_text(size) for size in values(2)},
+            # "Vải cotton" -> "cotton"; "vải" (fabric) on its own is not a filter
+            materials=words(values(1)) - {"vai"},
+            brands=values(4),
+            name_words=words(row[0] for row in rows),
+            accented_words=accented,
+        )
+
+    def _fold(self, query: str) -> str:
+        """Unaccented, lowercase query with ambiguous accented words marked."""
+        def fold_word(match: re.Match) -> str:
+            word = match.group(0)
+            folded = fold_text(word)
+            if folded != word and folded in self._vocabulary and folded not in STOPWORDS and word not in self.accented_words:
+                return folded + AMBIGUOUS_SUFFIX
+            return folded
+
+        return TOKEN_PATTERN.sub(fold_word, unicodedata.normalize("NFC", query.lower()))
+
+    def _parse(self, query: str) -> Optional[ProductFilter]:
+        product_filter = ProductFilter()
+        text = self._fold(query)
+
+        def bound(price: Optional[int], lower: bool) -> bool:
+            if price is None:
+                return False
+            if lower:
+                product_filter.min_price = price
+            else:
+                product_filter.max_price = price
+            return True
+
+        # Sizes first, so "size 30" is not read as an amount
+        for match in SIZE_PATTERN.finditer(text):
+            if match.group("size") in self.sizes:
+                product_filter.sizes.append(match.group("size"))
+                text = text.replace(match.group(0), " ", 1)
+        # Capital letter sizes without a prefix: "áo thun M"
+        for word in TOKEN_PATTERN.findall(query):
+            if word.isupper() and word.lower() in self.sizes and word.lower() not in self.brands \
+                    and word.lower() not in product_filter.sizes:
+                product_filter.sizes.append(word.lower())
+                text = re.sub(rf"\b{word.lower()}\b", " ", text, count=1)
+
+        for match in RANGE_PATTERN.finditer(text):
+            low, high = parse_amount(match.group("low")), parse_amount(match.group("high"))
+            if low is None or high is None:
+                return None
+            product_filter.min_price, product_filter.max_price = min(low, high), max(low, high)
+            text = text.replace(match.group(0), " ", 1)
+        for words, kind in ((MAX_PRICE_WORDS, "max"), (MIN_PRICE_WORDS, "min"), (ABOUT_PRICE_WORDS, "about")):
+            pattern = rf"(?<![\w<>])(?:{'|'.join(map(re.escape, words))})\s*(?:gia\s+)?(?P<amount>{_AMOUNT})"
+            for match in re.finditer(pattern, text):
+                price = parse_amount(match.group("amount"))
+                if kind == "about" and price is not None:
+                    product_filter.min_price = int(price * (1 - ABOUT_PRICE_MARGIN))
+                    product_filter.max_price = int(price * (1 + ABOUT_PRICE_MARGIN))
+                elif not bound(price, lower=kind == "min"):
+                    return None
+                text = text.replace(match.group(0), " ", 1)
+        if re.search(r"\d", text):
+            # An amount without a comparison ("áo 500k") or some other number
+            return None
+
+        for phrase in IN_STOCK_PHRASES:
+            if re.search(rf"\b{phrase}\b", text):
+                product_filter.in_stock = True
+                text = re.sub(rf"\b{phrase}\b", " ", text)
+
+        tokens = TOKEN_PATTERN.findall(text)
+        if tokens and tokens[-1] in QUESTION_PARTICLES:
+            tokens.pop()
+        if NEGATION_WORDS.intersection(tokens):
+            return None
+        # Colors can be two words ("nhieu mau"): take the longest phrases first
+        for color in sorted(self.colors, key=lambda value: -len(value.split())):
+            words = color.split()
+            i = 0
+            while i + len(words) <= len(tokens):
+                if tokens[i:i + len(words)] == words:
+                    product_filter.colors.append(color)
+                    del tokens[i:i + len(words)]
+                else:
+                    i += 1
+
+        for token in tokens:
+            if token in GENDER_WORDS:
+                if product_filter.gender not in (None, GENDER_WORDS[token]):
+                    # "áo cho nam hay nữ": more than one gender is not a single filter
+                    return None
+                product_filter.gender = GENDER_WORDS[token]
+            elif token in self.brands:
+                product_filter.brands.append(self.brands[token])
+            elif token in STOPWORDS:
+                continue
+            elif token in self.name_words:
+                product_filter.name_terms.append(token)
+            elif token in self.materials:
+                product_filter.materials.append(token)
+            else:
+                return None
+        # Nothing but filler words: not a product filter
+        return product_filter if product_filter != ProductFilter() else None
+
+    def parse(self, query: str) -> Optional[ProductFilter]:
+        """Filter covering the whole query, or None when the LLM should write the SQL."""
+        product_filter = self._parse(query)
+        with self._lock:
+            if product_filter is None:
+                self.fallbacks += 1
+            else:
+                self.parsed += 1
+        return product_filter
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            total = self.parsed + self.fallbacks
+            return {
+                "parsed": self.parsed,
+                "llm_fallbacks": self.fallbacks,
+                "parsed_rate": self.parsed / total if total else 0.0,
+            }
+
+
+_parsers: Dict[str, Tuple[object, Optional[ProductFilterParser]]] = {}
+_parsers_lock = threading.Lock()
+
+
+def get_product_filter_parser(db_path: str, immutable: bool = True) -> Optional[ProductFilterParser]:
+    """Process-wide parser for the catalog at `db_path`; None if it has no FTS5 index.
+
+    Rebuilt when the database file is replaced, so the vocabulary follows catalog refreshes.
+    """
+    pool = get_connection_pool(db_path, immutable=immutable)
+    version = pool.file_version()
+    with _parsers_lock:
+        if db_path not in _parsers or _parsers[db_path][0] != version:
+            conn = pool.connection()
+            parser = ProductFilterParser.from_connection(conn) if has_search_index(conn) else None
+            if parser and db_path in _parsers and _parsers[db_path][1]:
+                # Keep the counters across refreshes
+                parser.parsed, parser.fallbacks = _parsers[db_path][1].parsed, _parsers[db_path][1].fallbacks
+            _parsers[db_path] = (version, parser)
+        return _parsers[db_path][1]
@@ -0,0 +1,121 @@
+import argparse
+import re
+import sqlite3
+from typing import Dict, List, Optional, Tuple
+
+from leadgpt.text import TOKEN_PATTERN, fold_diacritics
+
+FTS_TABLE = "products_fts"
+# Text columns searchable through FTS5 (stored unaccented, so "ao so mi" finds "Áo sơ mi")
+FTS_COLUMNS = ["product_name", "material", "color", "brand", "size", "gender"]
+# B-tree indexes for the range and equality filters
+INDEXED_COLUMNS = ["price", "gender", "brand", "stock_quantity"]
+# Comma-joined columns normalized into (product_code, value) join tables (WITHOUT ROWID)
+MULTI_VALUED_COLUMNS = {"size": "product_sizes", "color": "product_colors"}
+
+# "FROM products p", "JOIN product_colors AS c", "FROM products a, products b"
+TABLE_ALIAS_PATTERN = re.compile(
+    r"(?:\bFROM|\bJOIN|,)\s+(\w+)(?:\s+(?:AS\s+)?"
+    r"(?!(?:ON|USING|WHERE|JOIN|LEFT|INNER|CROSS|NATURAL|GROUP|ORDER|LIMIT|FROM)\b)(\w+))?",
+    re.IGNORECASE,
+)
+
+_COLUMN = r"(?P<qualifier>\w+\.)?(?P<column>" + "|".join(FTS_COLUMNS) + r")"
+_TERM = r"'%(?P<term>[^'%]*)%'"
+# col LIKE '%x%', LOWER(col) LIKE '%x%', LOWER(col) LIKE LOWER('%x%'), with optional COLLATE NOCASE
+LIKE_PATTERN = re.compile(
+    rf"(?:LOWER\s*\(\s*{_COLUMN}\s*\)|{_COLUMN.replace('?P<', '?P<bare_')})"
+    rf"(?:\s+COLLATE\s+NOCASE)?\s+LIKE\s+(?:LOWER\s*\(\s*{_TERM}\s*\)|{_TERM.replace('?P<', '?P<bare_')})"
+    r"(?:\s+COLLATE\s+NOCASE)?",
+    re.IGNORECASE,
+)
+
+
+def fold_text(value) -> str:
+    return fold_diacritics(str(value or "")).lower()
+
+
+def match_expression(term: str, column: Optional[str] = None) -> Optional[str]:
+    """FTS5 query for a partial, accent-insensitive match of `term` (last word as a prefix)."""
+    tokens = TOKEN_PATTERN.findall(fold_text(term))
+    if not tokens:
+        return None
+    phrase = '"' + " ".join(tokens) + '"*'
+    return f"{column} : {phrase}" if column else phrase
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """Name or alias -> table for the tables a query reads ("FROM products p" -> {"p": "products"})."""
+    return {(alias or table).lower(): table.lower() for table, alias in TABLE_ALIAS_PATTERN.findall(sql)}
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone() is not None
+
+
+def rewrite_like_to_fts(sql: str) -> Tuple[str, List[str]]:
+    """Route "%...%" LIKE predicates on text columns through the FTS5 table.
+
+    Returns the rewritten SQL and the MATCH expressions to bind to its placeholders, in
+    order. Only predicates on products columns are rewritten: the size and color join
+    tables have no rowid, so their predicates (and those whose term has no searchable
+    words) are left unchanged.
+    """
+    params: List[str] = []
+    aliases = table_aliases(sql)
+
+    def replace(match: re.Match) -> str:
+        column = (match.group("column") or match.group("bare_column")).lower()
+        qualifier = match.group("qualifier") or match.group("bare_qualifier") or ""
+        if qualifier:
+            if aliases.get(qualifier[:-1].lower(), qualifier[:-1].lower()) != "products":
+                return match.group(0)
+        elif MULTI_VALUED_COLUMNS.get(column) in aliases.values():
+            # A bare size/color next to its join table may be that table's column
+            return match.group(0)
+        term = match.group("term") if match.group("term") is not None else match.group("bare_term")
+        expression = match_expression(term, column)
+        if expression is None:
+            return match.group(0)
+        params.append(expression)
+        return f"{qualifier}rowid IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?)"
+
+    return LIKE_PATTERN.sub(replace, sql), params
+
+
+def build_search_index(conn: sqlite3.Connection) -> int:
+    """Create the B-tree indexes and rebuild the FTS5 table from products; returns rows indexed."""
+    for column in INDEXED_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_products_{column} ON products ({column})")
+    conn.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    conn.execute(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({', '.join(FTS_COLUMNS)}, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    rows = conn.execute(f"SELECT rowid, {', '.join(FTS_COLUMNS)} FROM products").fetchall()
+    # Catalog values repeat a lot (colors, brands, sizes), so fold each distinct value once
+    folded = {}
+
+    def fold(value):
+        if value not in folded:
+            folded[value] = fold_text(value)
+        return folded[value]
+
+    conn.executemany(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES (?{', ?' * len(FTS_COLUMNS)})",
+        [(row[0], *(fold(value) for value in row[1:])) for row in rows],
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FTS5 table and filter indexes of the products database.")
+    parser.add_argument("db_path", nargs="?", default="data/products.db")
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.db_path) as conn:
+        print(f"Indexed {build_search_index(conn)} products in {args.db_path}")
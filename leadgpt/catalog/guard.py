@@ -0,0 +1,148 @@
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from leadgpt.catalog.fts import FTS_TABLE, has_search_index, table_aliases
+from leadgpt.config import PRODUCT_SQL_MAX_ROWS, PRODUCT_SQL_MAX_SCAN_ROWS, PRODUCT_SQL_TIMEOUT_SECONDS
+
+# Tables generated SQL may read (FTS5 also reads its own products_fts_* shadow tables)
+CATALOG_TABLES = {"products", "product_sizes", "product_colors", FTS_TABLE}
+# SQLite VM instructions between deadline checks
+PROGRESS_STEPS = 1000
+
+_COMMENT_OR_STRING = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"", re.DOTALL)
+# "SCAN t" and "SCAN t USING COVERING INDEX i" read every row; "SCAN t USING INDEX i" walks an
+# index in order (ORDER BY ... LIMIT) and stops early
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: USING COVERING INDEX \w+)?$")
+
+
+class QueryRejected(ValueError):
+    """Generated SQL that the guard refuses to run (or stopped at its deadline)."""
+
+
+class SQLGuard:
+    """Checks and bounds LLM-generated SQL before it runs on the catalog.
+
+    Only a single SELECT reading the catalog tables is allowed (enforced by an sqlite
+    authorizer while the statement is prepared and run), results are capped at `max_rows`,
+    plans that scan a large table without an index are refused, and execution is
+    interrupted after `timeout_seconds` through a progress handler.
+    """
+
+    def __init__(self, max_rows: int = 20, timeout_seconds: float = 0.5, max_scan_rows: int = 10000):
+        self.max_rows = max_rows
+        self.timeout_seconds = timeout_seconds
+        self.max_scan_rows = max_scan_rows
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _reject(self, reason: str, message: str) -> QueryRejected:
+        with self._lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return QueryRejected(message)
+
+    @staticmethod
+    def _authorize(action, arg1, arg2, database, trigger):
+        if action in (sqlite3.SQLITE_SELECT, sqlite3.SQLITE_FUNCTION):
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_READ and (arg1 in CATALOG_TABLES or arg1.startswith(f"{FTS_TABLE}_")):
+            return sqlite3.SQLITE_OK
+        if action == sqlite3.SQLITE_PRAGMA and arg1 == "data_version":
+            # Issued by FTS5 itself on every query
+            return sqlite3.SQLITE_OK
+        return sqlite3.SQLITE_DENY
+
+    @contextmanager
+    def _restricted(self, conn: sqlite3.Connection, deadline: Optional[float] = None) -> Iterator[None]:
+        if has_search_index(conn):
+            # Connect the FTS5 table first: its constructor reads the schema, which the authorizer denies
+            conn.execute(f"SELECT rowid FROM {FTS_TABLE} WHERE 0").fetchall()
+        conn.set_authorizer(self._authorize)
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+        try:
+            yield
+        finally:
+            # The connection is pooled: leave it unrestricted for trusted queries
+            conn.set_authorizer(None)
+            conn.set_progress_handler(None, PROGRESS_STEPS)
+
+    def _row_counts(self, conn: sqlite3.Connection) -> Dict[str, int]:
+        """Table sizes from the ANALYZE statistics, counted directly if there are none."""
+        counts: Dict[str, int] = {}
+        try:
+            for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                counts[table] = max(counts.get(table, 0), int(stat.split()[0]))
+        except sqlite3.OperationalError:
+            pass
+        for table in CATALOG_TABLES - set(counts) - {FTS_TABLE}:
+            try:
+                counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            except sqlite3.OperationalError:
+                continue
+        return counts
+
+    def prepare(self, conn: sqlite3.Connection, query: str, params: Tuple = ()) -> str:
+        """The query with a row cap, or QueryRejected if it is not a safe, indexed SELECT."""
+        with self._lock:
+            self.checked += 1
+        code = _COMMENT_OR_STRING.sub(lambda m: " " if m.group(0)[0] in "-/" else "''", query).strip().rstrip(";")
+        query = query.strip().rstrip(";").strip()
+        if ";" in code:
+            raise self._reject("multiple_statements", "Only a single SQL statement is allowed")
+        if not re.match(r"(?:SELECT|WITH)\b", code, re.IGNORECASE):
+            raise self._reject("not_select", "Only SELECT queries are allowed")
+        # Wrapping caps any LIMIT the query has (including a bound one) and adds one if missing;
+        # the newline keeps a trailing "--" comment from swallowing the closing parenthesis
+        bounded = f"SELECT * FROM ({query}\n) LIMIT {int(self.max_rows)}"
+        try:
+            with self._restricted(conn):
+                plan = conn.execute(f"EXPLAIN QUERY PLAN {bounded}", params).fetchall()
+        except sqlite3.DatabaseError as e:
+            raise self._reject("not_authorized" if "authoriz" in str(e) or "prohibited" in str(e) else "invalid",
+                               f"Query rejected: {e}") from None
+        aliases = {name: table for name, table in table_aliases(code).items() if table in CATALOG_TABLES}
+        counts = self._row_counts(conn)
+        for row in plan:
+            match = _FULL_SCAN.match(row[-1])
+            if match:
+                table = aliases.get(match.group(1).lower(), match.group(1).lower())
+                if counts.get(table, 0) > self.max_scan_rows:
+                    raise self._reject("full_scan", f"Query rejected: full scan of {table} ({counts[table]} rows)")
+        return bounded
+
+    @contextmanager
+    def limits(self, conn: sqlite3.Connection) -> Iterator[None]:
+        """Run the prepared query under the authorizer and the deadline."""
+        try:
+            with self._restricted(conn, deadline=time.perf_counter() + self.timeout_seconds):
+                yield
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise self._reject("timeout", f"Query stopped after {self.timeout_seconds}s") from None
+            if "not authorized" in str(e):
+                # Some denials only happen while the statement runs, e.g. load_extension()
+                raise self._reject("not_authorized", f"Query rejected: {e}") from None
+            raise
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"checked": self.checked, "rejected": dict(self.rejected)}
+
+
+_guard: Optional[SQLGuard] = None
+_guard_lock = threading.Lock()
+
+
+def get_sql_guard() -> SQLGuard:
+    """Process-wide guard configured from the PRODUCT_SQL_* settings."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = SQLGuard(PRODUCT_SQL_MAX_ROWS, PRODUCT_SQL_TIMEOUT_SECONDS, PRODUCT_SQL_MAX_SCAN_ROWS)
+    return _guard
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import hashlib
+import os
+import sqlite3
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from leadgpt.catalog.fts import MULTI_VALUED_COLUMNS, build_search_index
+
+PRODUCT_COLUMNS = [
+    ("product_code", "TEXT PRIMARY KEY"),
+    ("product_name", "TEXT NOT NULL"),
+    ("material", "TEXT"),
+    ("size", "TEXT"),
+    ("color", "TEXT"),
+    ("brand", "TEXT"),
+    ("gender", "TEXT"),
+    ("stock_quantity", "INTEGER NOT NULL"),
+    ("price", "INTEGER NOT NULL"),
+]
+INTEGER_COLUMNS = {"stock_quantity", "price"}
+
+SCHEMA = [
+    f"CREATE TABLE products ({', '.join(f'{name} {kind}' for name, kind in PRODUCT_COLUMNS)})",
+    *(
+        f"CREATE TABLE {table} (product_code TEXT NOT NULL REFERENCES products, {column} TEXT NOT NULL, "
+        f"PRIMARY KEY ({column}, product_code)) WITHOUT ROWID"
+        for column, table in MULTI_VALUED_COLUMNS.items()
+    ),
+    *(
+        f"CREATE INDEX idx_{table}_product_code ON {table} (product_code)"
+        for table in MULTI_VALUED_COLUMNS.values()
+    ),
+    "CREATE TABLE catalog_meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+def split_values(value: str) -> List[str]:
+    """"S, M, L, XL" -> ["S", "M", "L", "XL"] (duplicates and blanks dropped)."""
+    return list(dict.fromkeys(part.strip() for part in (value or "").split(",") if part.strip()))
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_rows(csv_path: str) -> Iterator[Tuple]:
+    with open(csv_path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = {name for name, _ in PRODUCT_COLUMNS} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{csv_path}: missing columns {sorted(missing)}")
+        for record in reader:
+            try:
+                yield tuple(
+                    int(float(record[name])) if name in INTEGER_COLUMNS else (record[name] or "").strip()
+                    for name, _ in PRODUCT_COLUMNS
+                )
+            except ValueError as e:
+                raise ValueError(f"{csv_path}, line {reader.line_num}: {e}") from None
+
+
+def _fsync(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def catalog_version(conn: sqlite3.Connection) -> Optional[Dict[str, str]]:
+    """Version stamp written by `ingest_csv`, or None for databases built some other way."""
+    try:
+        return dict(conn.execute("SELECT key, value FROM catalog_meta").fetchall())
+    except sqlite3.OperationalError:
+        return None
+
+
+def ingest_csv(csv_path: str, db_path: str, batch_size: int = 5000) -> Dict[str, str]:
+    """Build the products database from a CSV export and atomically replace `db_path`.
+
+    Rows are streamed in batches into a temporary file next to `db_path` inside a single
+    transaction, multi-valued columns are normalized into join tables, and the search
+    indexes are built before the file is swapped in with os.replace. Readers see either
+    the old database or the complete new one, never a partial load. Returns the stamp.
+    """
+    started = time.time()
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path, isolation_level=None)
+    try:
+        # The temporary file is discarded on failure, so skip the rollback journal and fsyncs;
+        # it is flushed to disk once, before the swap
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        insert_product = f"INSERT INTO products VALUES ({', '.join('?' * len(PRODUCT_COLUMNS))})"
+        column_index = {name: i for i, (name, _) in enumerate(PRODUCT_COLUMNS)}
+        rows = _read_rows(csv_path)
+        count = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(insert_product, batch)
+            for column, table in MULTI_VALUED_COLUMNS.items():
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO {table} (product_code, {column}) VALUES (?, ?)",
+                    [(row[0], value) for row in batch for value in split_values(row[column_index[column]])],
+                )
+            count += len(batch)
+        stamp = {
+            "version": time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(started)),
+            "source": os.path.basename(csv_path),
+            "source_sha256": file_sha256(csv_path),
+            "products": str(count),
+        }
+        conn.executemany("INSERT INTO catalog_meta VALUES (?, ?)", stamp.items())
+        # build_search_index commits the transaction
+        build_search_index(conn)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+        # Without these a crash after the swap could leave db_path pointing at unwritten pages
+        _fsync(tmp_path)
+        os.replace(tmp_path, db_path)
+        if os.name == "posix":
+            # Persist the rename itself (directories cannot be opened for fsync on Windows)
+            _fsync(os.path.dirname(os.path.abspath(db_path)))
+    except BaseException:
+        conn.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return stamp
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load products.csv into a freshly indexed products database.")
+    parser.add_argument("csv_path", nargs="?", default="data/products.csv")
+    parser.add_argument("db_path", nargs="?", default="data/products.db")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stamp = ingest_csv(args.csv_path, args.db_path, args.batch_size)
+    print(f"Loaded {stamp['products']} products into {args.db_path} "
+          f"(version {stamp['version']}) in {time.perf_counter() - start:.1f}s")
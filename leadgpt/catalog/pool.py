@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Read-only tuning applied to every pooled connection
+DEFAULT_PRAGMAS = {
+    "query_only": "ON",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -16000,  # negative = KiB, i.e. ~16 MB of page cache per connection
+    "temp_store": "MEMORY",
+}
+
+
+class ConnectionPool:
+    """Thread-aware pool of read-only SQLite connections to one database file.
+
+    Each thread gets its own connection (sqlite3 connections must not be shared across
+    threads without locking), opened once and reused on later calls, so the schema is
+    parsed and the page cache warmed once per thread instead of once per query. When the
+    file is replaced (catalog ingestion swaps in a new one), each thread reopens on its
+    next checkout.
+    """
+
+    def __init__(self, db_path: str, immutable: bool = True, pragmas: Optional[Dict[str, object]] = None):
+        self.db_path = db_path
+        self.immutable = immutable
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self.opened = 0
+        self.checkouts = 0
+        self.reopened = 0
+
+    def file_version(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the database file on disk (inode, mtime, size); changes when it is replaced."""
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _open(self) -> sqlite3.Connection:
+        # immutable=1 also skips file locking: only for files that are replaced, never edited in place
+        uri = f"file:{self.db_path}?mode=ro" + ("&immutable=1" if self.immutable else "")
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._connections.append(conn)
+            self.opened += 1
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use and after the file changes."""
+        conn = getattr(self._local, "conn", None)
+        version = self.file_version()
+        if conn is not None and self._local.version != version:
+            # An open connection keeps reading the replaced file: move to the new one
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+                self.reopened += 1
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self._local.conn = self._open()
+            self._local.version = version
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        # Threads notice the closed connection and reopen on their next checkout
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "db_path": self.db_path,
+                "connections": len(self._connections),
+                "opened": self.opened,
+                "checkouts": self.checkouts,
+                "reopened": self.reopened,
+                "reuse_rate": 1 - self.opened / self.checkouts if self.checkouts else 0.0,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str, immutable: bool = True) -> ConnectionPool:
+    """Process-wide pool for `db_path`, created on first use."""
+    with _pools_lock:
+        if db_path not in _pools:
+            _pools[db_path] = ConnectionPool(db_path, immutable=immutable)
+        return _pools[db_path]
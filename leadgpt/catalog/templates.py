@@ -0,0 +1,257 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from leadgpt.catalog.filters import (
+    AMOUNT_PATTERN,
+    SIZE_PATTERN,
+    STOPWORDS,
+    ProductFilterParser,
+    parse_amount,
+)
+from leadgpt.catalog.fts import fold_text, match_expression
+from leadgpt.config import PRODUCT_SQL_TEMPLATE_CACHE_MAX_ENTRIES
+from leadgpt.text import TOKEN_PATTERN
+
+# SQL literals: quoted strings, numbers and the ? placeholders the FTS rewrite leaves behind
+SQL_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|(?<![\w.])\d+(?:\.\d+)?(?![\w.])|\?")
+MATCH_PARAM_PATTERN = re.compile(r'(?P<column>\w+) : "(?P<phrase>[^"]*)"\*')
+
+
+class Slot(NamedTuple):
+    """A value cut out of the question: `kind` goes into the template key, `value` is bound."""
+
+    kind: str
+    value: object
+    folded: str
+
+
+class SQLTemplate(NamedTuple):
+    """Generated SQL with every literal turned into a placeholder.
+
+    `recipe` has one entry per placeholder: ("const", value), ("slot", i), ("match", i, column)
+    for an FTS5 expression built from slot i, or ("text", i, prefix, suffix) for a string
+    literal around slot i ("%" + value + "%").
+    """
+
+    sql: str
+    recipe: Tuple[tuple, ...]
+
+    def render(self, slots: List[Slot]) -> Tuple[str, Tuple]:
+        params = []
+        for step in self.recipe:
+            if step[0] == "const":
+                params.append(step[1])
+            elif step[0] == "slot":
+                params.append(slots[step[1]].value)
+            elif step[0] == "match":
+                params.append(match_expression(slots[step[1]].folded, step[2]))
+            else:
+                params.append(f"{step[2]}{slots[step[1]].value}{step[3]}")
+        return self.sql, tuple(params)
+
+
+def schema_fingerprint(conn: sqlite3.Connection) -> str:
+    """Hash of the database schema; templates generated for another schema are never reused."""
+    rows = conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    return hashlib.sha256(repr(rows).encode("utf8")).hexdigest()[:16]
+
+
+def slot_question(question: str, parser: ProductFilterParser) -> Tuple[str, List[Slot]]:
+    """Template key and slot values of a question.
+
+    Prices, sizes, colors, brands and runs of product-name words are replaced by
+    placeholders, so "áo sơ mi trắng dưới 500k" and "quần jean xanh dưới 300k" share the key
+    "<name> <color> duoi <price>". Every other word stays in the key as typed (unaccented).
+    """
+    text = unicodedata.normalize("NFC", question.lower())
+    folded = fold_text(text)
+    if len(folded) != len(text):
+        # Folding keeps positions for NFC text; otherwise fall back to unaccented values
+        text = folded
+    spans: List[Tuple[int, int, str, object]] = []
+
+    def free(start: int, end: int) -> bool:
+        return all(end <= span[0] or start >= span[1] for span in spans)
+
+    for match in SIZE_PATTERN.finditer(folded):
+        if match.group("size") in parser.sizes:
+            spans.append((match.start("size"), match.end("size"), "size", text[match.start("size"):match.end("size")]))
+    for match in re.finditer(r"(?<![\w.,])" + AMOUNT_PATTERN.pattern + r"(?!\w)", folded):
+        price = parse_amount(match.group(0))
+        if price is not None and free(match.start(), match.end()):
+            spans.append((match.start(), match.end(), "price", price))
+    words = [match for match in TOKEN_PATTERN.finditer(folded) if free(match.start(), match.end())]
+    colors = sorted(parser.colors, key=lambda value: -len(value.split()))
+    color_starts = {color.split()[0] for color in colors}
+
+    def product_word(word: str) -> bool:
+        return word not in STOPWORDS and word not in color_starts and (word in parser.name_words or word in parser.materials)
+
+    i = 0
+    while i < len(words):
+        word = words[i].group(0)
+        color = next(
+            (color for color in colors if [w.group(0) for w in words[i:i + len(color.split())]] == color.split()),
+            None,
+        )
+        if color:
+            end = words[i + len(color.split()) - 1].end()
+            spans.append((words[i].start(), end, "color", text[words[i].start():end]))
+            i += len(color.split())
+        elif word in parser.brands:
+            spans.append((words[i].start(), words[i].end(), "brand", parser.brands[word]))
+            i += 1
+        elif product_word(word):
+            # A run of product words is one slot: "áo sơ mi", "quần jean"
+            j = i
+            while j + 1 < len(words) and product_word(words[j + 1].group(0)):
+                j += 1
+            spans.append((words[i].start(), words[j].end(), "name", text[words[i].start():words[j].end()]))
+            i = j + 1
+        else:
+            i += 1
+
+    spans.sort()
+    key, slots, position = [], [], 0
+    for start, end, kind, value in spans:
+        key.extend(TOKEN_PATTERN.findall(folded[position:start]))
+        key.append(f"<{kind}>")
+        slots.append(Slot(kind, value, folded[start:end]))
+        position = end
+    key.extend(TOKEN_PATTERN.findall(folded[position:]))
+    return " ".join(key), slots
+
+
+def _literal_value(literal: str):
+    if literal.startswith("'"):
+        return literal[1:-1].replace("''", "'")
+    return float(literal) if "." in literal else int(literal)
+
+
+def build_template(sql: str, params: Tuple, slots: List[Slot]) -> Optional[SQLTemplate]:
+    """Parameterize generated SQL (after the FTS5 rewrite) against the question's slots.
+
+    Returns None unless every slot maps onto exactly the literals that carry it, so a
+    template is only reused when swapping in new values is known to be correct.
+    """
+    values = iter(params)
+    literals: List[object] = []
+
+    def placeholder(match: re.Match) -> str:
+        literals.append(next(values) if match.group(0) == "?" else _literal_value(match.group(0)))
+        return "?"
+
+    template_sql = SQL_LITERAL_PATTERN.sub(placeholder, sql)
+    recipe: List[tuple] = []
+    used = set()
+    for literal in literals:
+        candidates = []
+        for i, slot in enumerate(slots):
+            if isinstance(literal, (int, float)):
+                if slot.kind == "price" and literal == slot.value:
+                    candidates.append(("slot", i))
+                continue
+            match = MATCH_PARAM_PATTERN.fullmatch(literal)
+            if match:
+                if match.group("phrase") == " ".join(TOKEN_PATTERN.findall(slot.folded)):
+                    candidates.append(("match", i, match.group("column")))
+            elif slot.kind != "price":
+                literal = unicodedata.normalize("NFC", literal)
+                folded = fold_text(literal)
+                found = re.search(rf"(?<!\w){re.escape(slot.folded)}(?!\w)", folded)
+                if found and len(folded) == len(literal):
+                    candidates.append(("text", i, literal[:found.start()], literal[found.end():]))
+        if len(candidates) > 1:
+            return None
+        if candidates:
+            recipe.append(candidates[0])
+            used.add(candidates[0][1])
+        else:
+            recipe.append(("const", literal))
+    if len(used) != len(slots):
+        return None
+    return SQLTemplate(template_sql, tuple(recipe))
+
+
+class SQLTemplateCache:
+    """LRU of parameterized product SQL, keyed by slot template and schema fingerprint.
+
+    A question whose template was seen before reuses the stored SQL with its own values
+    bound, skipping LLM SQL generation. Changing the database schema empties the cache.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._templates: "OrderedDict[Tuple[str, str], SQLTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.uncacheable = 0
+        self.invalidations = 0
+
+    def _check_schema(self, fingerprint: str) -> None:
+        if self._fingerprint is not None and fingerprint != self._fingerprint:
+            self._templates.clear()
+            self.invalidations += 1
+        self._fingerprint = fingerprint
+
+    def lookup(self, key: str, slots: List[Slot], fingerprint: str) -> Optional[Tuple[str, Tuple]]:
+        """SQL and bound values for the question, or None on a miss."""
+        with self._lock:
+            self._check_schema(fingerprint)
+            template = self._templates.get((fingerprint, key))
+            if template is None:
+                self.misses += 1
+                return None
+            self._templates.move_to_end((fingerprint, key))
+            self.hits += 1
+        return template.render(slots)
+
+    def store(self, key: str, slots: List[Slot], fingerprint: str, sql: str, params: Tuple) -> bool:
+        """Remember the SQL generated for this question; False if it cannot be templated."""
+        template = build_template(sql, params, slots)
+        with self._lock:
+            if template is None:
+                self.uncacheable += 1
+                return False
+            self._check_schema(fingerprint)
+            self._templates[(fingerprint, key)] = template
+            self._templates.move_to_end((fingerprint, key))
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+            self.stored += 1
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._templates),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stored": self.stored,
+                "uncacheable": self.uncacheable,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache: Optional[SQLTemplateCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_sql_template_cache() -> SQLTemplateCache:
+    """Process-wide product SQL template cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SQLTemplateCache(PRODUCT_SQL_TEMPLATE_CACHE_MAX_ENTRIES)
+    return _cache
@@ -1,7 +1,6 @@
 # config.py
 import os
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 # Load environment variables
 load_dotenv("E:\\chatbot\\LeadGPT\\.env")
@@ -13,6 +12,62 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 DATA_PRODUCT_PATH = "data/products.db"
 DATA_TEXT_PATH = "data/policy.txt"
 STORE_DIRECTORY = "data/datastore"
+# The products database is opened read-only; immutable also skips locking (file is replaced, never edited)
+PRODUCT_DB_IMMUTABLE = os.getenv("PRODUCT_DB_IMMUTABLE", "true").lower() == "true"
+# Answer plain filter searches (price, color, size, gender, brand...) with a local parser, not LLM SQL
+PRODUCT_FILTER_PARSER_ENABLED = os.getenv("PRODUCT_FILTER_PARSER_ENABLED", "true").lower() == "true"
+# Reuse LLM-generated product SQL for questions of the same shape ("<name> <color> duoi <price>")
+PRODUCT_SQL_TEMPLATE_CACHE_ENABLED = os.getenv("PRODUCT_SQL_TEMPLATE_CACHE_ENABLED", "true").lower() == "true"
+PRODUCT_SQL_TEMPLATE_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_SQL_TEMPLATE_CACHE_MAX_ENTRIES", "1024"))
+# Load the catalog into NumPy columns at startup and answer parsed filter searches from memory
+PRODUCT_COLUMNAR_ENGINE_ENABLED = os.getenv("PRODUCT_COLUMNAR_ENGINE_ENABLED", "false").lower() == "true"
+# Guard for LLM-written SQL: single SELECT on catalog tables, row cap, deadline, no large full scans
+PRODUCT_SQL_GUARD_ENABLED = os.getenv("PRODUCT_SQL_GUARD_ENABLED", "true").lower() == "true"
+PRODUCT_SQL_MAX_ROWS = int(os.getenv("PRODUCT_SQL_MAX_ROWS", "20"))
+PRODUCT_SQL_TIMEOUT_SECONDS = float(os.getenv("PRODUCT_SQL_TIMEOUT_SECONDS", "0.5"))
+PRODUCT_SQL_MAX_SCAN_ROWS = int(os.getenv("PRODUCT_SQL_MAX_SCAN_ROWS", "10000"))
 
-# Embeddings
-EMBEDDINGS = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
\ No newline at end of file
+# Embeddings: "google" (default), "huggingface" or "local" (opt-in offline hashing, no
+# network, but weaker policy retrieval than a semantic model)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "google")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "2048"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Content-addressed cache of document vectors, so index rebuilds only embed new text
+EMBEDDING_CACHE_DIRECTORY = os.getenv("EMBEDDING_CACHE_DIRECTORY", "data/embedding_cache") or None
+# Vectors from different providers are not comparable, so each one gets its own index
+POLICY_STORE_DIRECTORY = STORE_DIRECTORY if EMBEDDING_PROVIDER == "google" else os.path.join(STORE_DIRECTORY, EMBEDDING_PROVIDER)
+# Number of FAQ answers policy_search_tool returns
+POLICY_SEARCH_K = int(os.getenv("POLICY_SEARCH_K", "3"))
+# Policy index on disk: "mmap" (memory-mapped vectors, SQLite documents read per hit) or "pickle"
+POLICY_INDEX_FORMAT = os.getenv("POLICY_INDEX_FORMAT", "mmap")
+# Policy FAISS index type: flat, sq8, pq, ivf, ivf_sq8, ivf_pq or a faiss.index_factory string
+POLICY_INDEX_TYPE = os.getenv("POLICY_INDEX_TYPE", "flat")
+POLICY_IVF_NPROBE = int(os.getenv("POLICY_IVF_NPROBE", "8"))
+POLICY_PQ_M = int(os.getenv("POLICY_PQ_M", "64"))
+# Hybrid policy retrieval: weights of the FAISS and BM25 rankings in reciprocal rank fusion (0 turns one off)
+POLICY_DENSE_WEIGHT = float(os.getenv("POLICY_DENSE_WEIGHT", "1.0"))
+POLICY_BM25_WEIGHT = float(os.getenv("POLICY_BM25_WEIGHT", "1.0"))
+POLICY_RRF_K = int(os.getenv("POLICY_RRF_K", "60"))
+# Answer near-verbatim FAQ questions directly (word overlap with a policy.txt question >= threshold)
+FAQ_FAST_PATH_ENABLED = os.getenv("FAQ_FAST_PATH_ENABLED", "true").lower() == "true"
+FAQ_FAST_PATH_THRESHOLD = float(os.getenv("FAQ_FAST_PATH_THRESHOLD", "0.85"))
+
+# Sessions
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_MEMORY_MB = float(os.getenv("SESSION_MAX_MEMORY_MB", "256"))
+
+# Turn planner: one structured LLM call per turn instead of stage + summary + agent
+TURN_PLANNER_ENABLED = os.getenv("TURN_PLANNER_ENABLED", "false").lower() == "true"
+
+# Local stage classifier (falls back to the LLM analyzer below the threshold)
+STAGE_CLASSIFIER_PATH = os.getenv("STAGE_CLASSIFIER_PATH", "data/stage_classifier.npz")
+STAGE_CLASSIFIER_THRESHOLD = float(os.getenv("STAGE_CLASSIFIER_THRESHOLD", "0.8"))
+STAGE_LOG_PATH = os.getenv("STAGE_LOG_PATH")
+
+# LLM response cache for the deterministic chains (the agent reply is never cached)
+LLM_CACHE_CHAINS = {name.strip() for name in os.getenv("LLM_CACHE_CHAINS", "stage_analyzer,summary,product_sql").split(",") if name.strip()}
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db") or None
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "4096"))
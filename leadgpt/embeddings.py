@@ -0,0 +1,143 @@
+import re
+import threading
+import unicodedata
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_core.embeddings import Embeddings
+
+from leadgpt.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CACHE_DIRECTORY,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_MODEL,
+    EMBEDDING_PROVIDER,
+)
+from leadgpt.text import TOKEN_PATTERN
+
+
+class HashingEmbeddings(Embeddings):
+    """CPU-only embeddings: signed feature hashing of words, word bigrams and character n-grams.
+
+    Stateless (no vocabulary, no training), so the same text gets the same vector on any
+    machine and building or querying an index needs no network.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 2048,
+        ngram_range: Tuple[int, int] = (3, 5),
+        batch_size: int = 64,
+    ):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.batch_size = batch_size
+
+    def _features(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text.lower()))
+        features = [f"w:{token}" for token in tokens]
+        features.extend(f"b:{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+        low, high = self.ngram_range
+        for token in tokens:
+            padded = f"<{token}>"
+            for n in range(low, high + 1):
+                features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode a batch of texts into an L2-normalized (len(texts), dimensions) matrix."""
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode("utf8")) for feature in self._features(text)),
+                dtype=np.int64,
+            )
+            signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dimensions, signs)
+        # Sublinear term frequency so repeated words do not dominate
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = [self.encode(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(batches).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def _local_embeddings() -> Embeddings:
+    return HashingEmbeddings(dimensions=EMBEDDING_DIMENSIONS, batch_size=EMBEDDING_BATCH_SIZE)
+
+
+def _google_embeddings() -> Embeddings:
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL or "models/embedding-001")
+
+
+def _huggingface_embeddings() -> Embeddings:
+    # Needs sentence-transformers; EMBEDDING_MODEL may also be a local model directory
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL or "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE, "normalize_embeddings": True},
+    )
+
+
+EMBEDDING_PROVIDERS: Dict[str, Callable[[], Embeddings]] = {
+    "local": _local_embeddings,
+    "google": _google_embeddings,
+    "huggingface": _huggingface_embeddings,
+}
+
+_embeddings: Dict[str, Embeddings] = {}
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings(provider: Optional[str] = None) -> Embeddings:
+    """Embedding model for `provider` (default: EMBEDDING_PROVIDER), created once per process."""
+    provider = provider or EMBEDDING_PROVIDER
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {provider!r}, expected one of {sorted(EMBEDDING_PROVIDERS)}")
+    with _embeddings_lock:
+        if provider not in _embeddings:
+            _embeddings[provider] = EMBEDDING_PROVIDERS[provider]()
+        return _embeddings[provider]
+
+
+def embedding_fingerprint(provider: Optional[str] = None) -> str:
+    """Name of the vector space of `provider`: indexes and cached vectors are reused only within it."""
+    provider = provider or EMBEDDING_PROVIDER
+    parts = [provider]
+    if provider == "local":
+        parts.append(str(EMBEDDING_DIMENSIONS))
+    if EMBEDDING_MODEL:
+        parts.append(EMBEDDING_MODEL)
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", "-".join(parts))
+
+
+def cached_embeddings(embeddings: Embeddings, provider: Optional[str] = None) -> Embeddings:
+    """Wrap `embeddings` with the content-addressed on-disk cache in EMBEDDING_CACHE_DIRECTORY.
+
+    Document vectors are stored under hash(text), so rebuilding an index only calls the
+    model for texts it has not seen. The local hashing backend is cheaper to recompute
+    than to read back, so it is returned unwrapped.
+    """
+    provider = provider or EMBEDDING_PROVIDER
+    if not EMBEDDING_CACHE_DIRECTORY or provider == "local":
+        return embeddings
+    return CacheBackedEmbeddings.from_bytes_store(
+        embeddings,
+        LocalFileStore(EMBEDDING_CACHE_DIRECTORY),
+        namespace=f"{embedding_fingerprint(provider)}/",
+        batch_size=EMBEDDING_BATCH_SIZE,
+    )
@@ -0,0 +1,143 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.load import dumps, loads
+
+from leadgpt.config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS
+
+
+class LLMResponseCache(BaseCache):
+    """Content-addressed LLM response cache with an in-memory LRU and an on-disk SQLite tier.
+
+    Keys hash the rendered prompt together with the model parameters (the llm_string
+    langchain passes in), so a different model, temperature or stop sequence never
+    shares an entry. Set on a model through `cached_llm` so each chain opts in separately.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = 86400,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, RETURN_VAL_TYPE]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created_at REAL)"
+            )
+            self._conn.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf8")).hexdigest()
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl_seconds is None or time.time() - created_at < self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: RETURN_VAL_TYPE) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self.make_key(prompt, llm_string)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._fresh(entry[0]):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._fresh(row[1]):
+                    value = loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self.make_key(prompt, llm_string)
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, return_val)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, dumps(return_val), created_at),
+                )
+                self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the SQLite tier, returning how many were removed."""
+        if self._conn is None or self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+def cached_llm(llm: BaseLanguageModel, cache: Optional[BaseCache]) -> BaseLanguageModel:
+    """Copy of `llm` that reads and writes `cache`; the original model stays uncached."""
+    if cache is None:
+        return llm
+    # construct() keeps the API client and the fields BaseModel.copy would drop (e.g. callbacks)
+    return type(llm).construct(
+        _fields_set=llm.__fields_set__ | {"cache"},
+        **{**llm.__dict__, "cache": cache},
+    )
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Process-wide cache configured from leadgpt.config, created on first use."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache(
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                db_path=LLM_CACHE_PATH,
+                ttl_seconds=LLM_CACHE_TTL_SECONDS,
+            )
+        return _shared_cache
@@ -0,0 +1,27 @@
+from typing import Dict, Optional
+
+# Fields (and their order) of the summary produced by LEAD_PROMPT_TEMPLATE
+CUSTOMER_INFO_FIELDS = ["Customer Name", "Email", "Phone", "Products of Interest"]
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return None if value in ("", "None", "null") else value
+
+
+def parse_customer_info(text: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a "Field: value" summary into a dict with every field (None if missing)."""
+    info: Dict[str, Optional[str]] = {field: None for field in CUSTOMER_INFO_FIELDS}
+    for line in (text or "").splitlines():
+        key, sep, value = line.partition(":")
+        key = key.strip(" -*")
+        if sep and key in info:
+            info[key] = _clean(value)
+    return info
+
+
+def format_customer_info(info: Dict[str, Optional[str]]) -> str:
+    """Render customer fields in the same format as the summary prompt output."""
+    return "\n".join(f"{field}: {_clean(info.get(field)) or 'None'}" for field in CUSTOMER_INFO_FIELDS)
@@ -0,0 +1,93 @@
+import re
+from typing import Dict, List, Optional
+
+from leadgpt.text import fold_diacritics
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Vietnamese numbers: 0xxxxxxxxx or +84/84 xxxxxxxxx, digits optionally split by spaces, dots or dashes
+PHONE_PATTERN = re.compile(r"(?<![\d+])(?:\+?84|0)(?:[\s.-]?\d){9}(?!\d)")
+
+_NAME = r"(?P<name>[^\W\d_]+(?:[ \t]+[^\W\d_]+){0,4})"
+NAME_PATTERNS = [
+    re.compile(r"\b(?:tôi|tui|mình|em|anh|chị|tớ|con|cháu)\s+tên\s+(?:là\s+)?" + _NAME, re.IGNORECASE),
+    re.compile(r"\btên\s+(?:của\s+)?(?:tôi|tui|mình|em|anh|chị|tớ)\s+(?:là\s+)?" + _NAME, re.IGNORECASE),
+    re.compile(r"\bgọi\s+(?:tôi|tui|mình|em|anh|chị|tớ)\s+(?:là\s+)?" + _NAME, re.IGNORECASE),
+    re.compile(r"\b(?:my name is|my name's|call me)\s+" + _NAME, re.IGNORECASE),
+]
+# "Tôi là Nam": a name only if capitalized ("em là sinh viên" is not); any other "là"
+# self-introduction is left to the LLM
+INTRODUCTION_PATTERN = re.compile(r"\b(?:tôi|tui|mình|em|anh|chị|tớ)\s+là\s+" + _NAME, re.IGNORECASE)
+# Words that end a name captured by NAME_PATTERNS ("tôi tên là An và email ...")
+NAME_STOPWORDS = {
+    "và", "nhé", "nha", "ạ", "à", "đó", "nhá", "email", "mail", "sđt", "số", "điện", "thoại",
+    "muốn", "cần", "đang", "thì", "còn", "ở", "gì", "không", "and", "my", "i", "phone",
+}
+
+ACKNOWLEDGEMENTS = {
+    "ok", "oke", "okay", "okie", "vâng", "dạ", "dạ vâng", "ừ", "ừm", "uhm", "ờ", "được", "đúng rồi",
+    "cảm ơn", "cám ơn", "cảm ơn bạn", "cảm ơn shop", "thanks", "thank you", "thank", "yes", "no",
+    "không", "có", "xin chào", "chào", "chào shop", "hello", "hi", "bye", "tạm biệt",
+}
+# Hints are matched against the unaccented message, so "ao so mi" counts like "áo sơ mi"
+# Hints that a message talks about products (Products of Interest needs the LLM); "túi" and
+# "dép" only count in compounds, since unaccented "tui" and "dep" are also "tui" and "đẹp"
+PRODUCT_HINTS = re.compile(
+    r"\b(?:ao|quan|vay|dam|giay|dep (?:le|lao|to|xop)|sandal|tui xach|balo|mu|non|khan|that lung|phu kien|size|mau|gia|mua|tim|"
+    r"cotton|jean|jeans|hoodie|shirt|pants|dress|skirt|jacket|shoes|bag)\b",
+    re.IGNORECASE,
+)
+# Hints that a message carries a profile field the rules may have missed
+PROFILE_HINTS = re.compile(r"\b(?:ten|name|email|e-mail|mail|sdt|so dien thoai|dien thoai|phone|zalo)\b", re.IGNORECASE)
+
+
+def _normalize(message: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", message.lower()).split())
+
+
+def _name_words(name: str, capitalized: bool = False) -> List[str]:
+    words = []
+    for word in name.split():
+        if word.lower() in NAME_STOPWORDS or (capitalized and not word[0].isupper()):
+            break
+        words.append(word)
+    return words
+
+
+def extract_name(message: str) -> Optional[str]:
+    for pattern in NAME_PATTERNS:
+        match = pattern.search(message)
+        words = _name_words(match.group("name")) if match else []
+        if words:
+            return " ".join(word.capitalize() for word in words)
+    match = INTRODUCTION_PATTERN.search(message)
+    words = _name_words(match.group("name"), capitalized=True) if match else []
+    return " ".join(words) if words else None
+
+
+def extract_customer_fields(message: str) -> Dict[str, str]:
+    """Deterministically extract Customer Name, Email and Phone from one message."""
+    fields = {}
+    name = extract_name(message)
+    if name:
+        fields["Customer Name"] = name
+    email = EMAIL_PATTERN.search(message)
+    if email:
+        fields["Email"] = email.group(0)
+    phone = PHONE_PATTERN.search(message)
+    if phone:
+        fields["Phone"] = re.sub(r"[\s.-]", "", phone.group(0))
+    return fields
+
+
+def needs_llm(message: str) -> bool:
+    """Whether a message plausibly carries profile info the rules cannot capture."""
+    normalized = _normalize(message)
+    if not normalized or normalized in ACKNOWLEDGEMENTS:
+        return False
+    folded = fold_diacritics(message)
+    if PRODUCT_HINTS.search(folded):
+        return True
+    if PROFILE_HINTS.search(folded) or INTRODUCTION_PATTERN.search(message):
+        # Mentions a field: fine only if the rules found something to record
+        return not extract_customer_fields(message)
+    return False
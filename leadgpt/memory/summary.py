@@ -1,8 +1,12 @@
+from typing import List, Optional, Union
+
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.prompts import BasePromptTemplate
 from langchain_core.pydantic_v1 import BaseModel
 
 from leadgpt.memory.prompt import LEAD_PROMPT_TEMPLATE
+from leadgpt.memory.customer_info import format_customer_info, parse_customer_info
+from leadgpt.memory.extractor import extract_customer_fields, needs_llm
 
 class LeadSummaryMemory(BaseModel):
     """Simplified Lead Summary Memory"""
@@ -10,13 +14,45 @@ class LeadSummaryMemory(BaseModel):
     llm: BaseLanguageModel
     prompt: BasePromptTemplate = LEAD_PROMPT_TEMPLATE
     buffer: str = ""
+    # Deterministic extraction first; the LLM runs only for messages the rules can't cover
+    use_rules: bool = True
+    rule_updates: int = 0
+    llm_updates: int = 0
+
+    def rule_based_summary(self, input: dict) -> Optional[str]:
+        """Merge rule-extracted fields into the previous summary, or None if the LLM is needed"""
+        if not self.use_rules:
+            return None
+        new_lines: Union[str, List[str]] = input.get("new_lines") or []
+        lines = [new_lines] if isinstance(new_lines, str) else list(new_lines)
+        if any(needs_llm(line) for line in lines):
+            return None
+        info = parse_customer_info(input.get("customer_info"))
+        for line in lines:
+            info.update(extract_customer_fields(line))
+        self.rule_updates += 1
+        return format_customer_info(info)
 
     def predict_new_summary(self, input: dict) -> str:
         """Predict new summary based on existing summary and new lines"""
+        summary = self.rule_based_summary(input)
+        if summary is not None:
+            return summary
+        self.llm_updates += 1
         chain = self.prompt | self.llm
         result = chain.invoke(input)
         return result.content if hasattr(result, 'content') else str(result)
 
+    async def apredict_new_summary(self, input: dict) -> str:
+        """Async version of predict_new_summary"""
+        summary = self.rule_based_summary(input)
+        if summary is not None:
+            return summary
+        self.llm_updates += 1
+        chain = self.prompt | self.llm
+        result = await chain.ainvoke(input)
+        return result.content if hasattr(result, 'content') else str(result)
+
     def update_summary(self, new_lines: str) -> None:
         """Update the summary with new lines"""
         self.buffer = self.predict_new_summary({
@@ -24,6 +60,13 @@ class LeadSummaryMemory(BaseModel):
             "new_lines": new_lines
         })
 
+    async def aupdate_summary(self, new_lines: str) -> None:
+        """Async version of update_summary"""
+        self.buffer = await self.apredict_new_summary({
+            "customer_info": self.buffer,
+            "new_lines": new_lines
+        })
+
     def get_summary(self) -> str:
         """Get the current summary"""
         return self.buffer
@@ -0,0 +1,107 @@
+import math
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from leadgpt.text import tokenize_vietnamese
+
+
+def record_key(doc: Document) -> Hashable:
+    """Identity of a policy record shared by the dense and BM25 results."""
+    return doc.metadata.get("id", doc.page_content)
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring over a fixed set of documents.
+
+    With `docstore` (anything with a `search(id)` method, e.g. the FAISS docstore) only
+    the document ids are kept and hits are read back from it.
+    """
+
+    def __init__(
+        self,
+        documents: Iterable[Document],
+        tokenizer: Callable[[str], List[str]] = tokenize_vietnamese,
+        text_getter: Optional[Callable[[Document], str]] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        docstore: Optional[Any] = None,
+    ):
+        self.documents: List[Document] = []
+        self.ids: List[str] = []
+        self.docstore = docstore
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        text_getter = text_getter or (lambda doc: doc.page_content)
+
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+        for i, doc in enumerate(documents):
+            if docstore is None:
+                self.documents.append(doc)
+            else:
+                self.ids.append(doc.metadata["id"])
+            counts = Counter(self.tokenizer(text_getter(doc)))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((i, tf))
+        self._count = len(lengths)
+        lengths = np.array(lengths, dtype=np.float32)
+        average_length = float(lengths.mean()) if self._count else 0.0
+        self._length_norm = k1 * (1 - b + b * lengths / (average_length or 1.0))
+
+        n = self._count
+        self._postings: Dict[str, Tuple[float, np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            doc_ids = np.fromiter((i for i, _ in entries), dtype=np.int64, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            self._postings[term] = (idf, doc_ids, tfs)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _document(self, i: int) -> Document:
+        return self.documents[i] if self.docstore is None else self.docstore.search(self.ids[i])
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self._count, dtype=np.float32)
+        for term in set(self.tokenizer(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            idf, doc_ids, tfs = posting
+            scores[doc_ids] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norm[doc_ids])
+        return scores
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """Top-k documents with a positive score, best first."""
+        scores = self.scores(query)
+        k = min(k, int((scores > 0).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._document(i), float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Document]],
+    weights: Optional[Sequence[float]] = None,
+    k: int = 4,
+    rrf_k: int = 60,
+) -> List[Document]:
+    """Merge ranked lists with weighted reciprocal rank fusion: sum of w / (rrf_k + rank)."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Hashable, float] = defaultdict(float)
+    documents: Dict[Hashable, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, start=1):
+            key = record_key(doc)
+            scores[key] += weight / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, Mapping, Tuple, Union
+
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only docstore backed by SQLite: a document is only read when a search hits it.
+
+    Rows are keyed both by docstore id and by FAISS position, so the store also serves as
+    the index_to_docstore_id mapping (see SQLiteIndexMapping).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def id_at(self, position: int) -> str:
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM documents WHERE position = ?", (position,)).fetchone()
+        if row is None:
+            raise KeyError(position)
+        return row[0]
+
+    def ids(self) -> list:
+        """All docstore ids in index order."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM documents ORDER BY position")]
+
+    def iter_documents(self) -> Iterator[Tuple[str, Document]]:
+        """All (id, document) pairs in index order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, page_content, metadata FROM documents ORDER BY position").fetchall()
+        for doc_id, page_content, metadata in rows:
+            yield doc_id, Document(page_content=page_content, metadata=json.loads(metadata))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteIndexMapping(Mapping):
+    """FAISS position -> docstore id, looked up in SQLiteDocstore instead of held in a dict."""
+
+    def __init__(self, docstore: SQLiteDocstore):
+        self.docstore = docstore
+        self._length = len(docstore)
+
+    def __getitem__(self, position: int) -> str:
+        return self.docstore.id_at(int(position))
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self._length))
+
+    def values(self):
+        # One query instead of a lookup per position
+        return self.docstore.ids()
+
+    def __len__(self) -> int:
+        return self._length
+
+
+def mmap_store_paths(directory: str, index_name: str) -> Dict[str, str]:
+    return {
+        "index": os.path.join(directory, f"{index_name}.faiss"),
+        "docs": os.path.join(directory, f"{index_name}.docs.db"),
+    }
+
+
+def mmap_store_exists(directory: str, index_name: str) -> bool:
+    return all(os.path.exists(path) for path in mmap_store_paths(directory, index_name).values())
+
+
+def save_mmap_store(vectorstore: FAISS, directory: str, index_name: str) -> None:
+    """Write the vectors as a plain FAISS file and the documents to SQLite (no pickle)."""
+    os.makedirs(directory, exist_ok=True)
+    paths = mmap_store_paths(directory, index_name)
+
+    tmp_docs = f"{paths['docs']}.tmp"
+    if os.path.exists(tmp_docs):
+        os.remove(tmp_docs)
+    conn = sqlite3.connect(tmp_docs)
+    conn.execute("CREATE TABLE documents (position INTEGER PRIMARY KEY, id TEXT UNIQUE, page_content TEXT, metadata TEXT)")
+    rows = []
+    for position, doc_id in vectorstore.index_to_docstore_id.items():
+        doc = vectorstore.docstore.search(doc_id)
+        rows.append((position, doc_id, doc.page_content, json.dumps(doc.metadata, ensure_ascii=False)))
+    conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    tmp_index = f"{paths['index']}.tmp"
+    faiss.write_index(vectorstore.index, tmp_index)
+    os.replace(tmp_index, paths["index"])
+    os.replace(tmp_docs, paths["docs"])
+
+
+def close_store(vectorstore: FAISS) -> None:
+    """Release the SQLite connection of a store opened by load_mmap_store (no-op otherwise).
+
+    The mapped FAISS file is unmapped once the store is no longer referenced.
+    """
+    if isinstance(vectorstore.docstore, SQLiteDocstore):
+        vectorstore.docstore.close()
+
+
+def load_mmap_store(directory: str, index_name: str, embeddings: Embeddings, in_memory: bool = False) -> FAISS:
+    """Open a store written by save_mmap_store.
+
+    By default the vector codes of flat, SQ and PQ indexes are memory-mapped (shared
+    through the page cache by every process that opens the file) and documents stay on
+    disk until a search returns them. IVF indexes are not mapped: their inverted lists are
+    read into memory, only the coarse quantizer is mapped. With in_memory=True everything
+    is loaded into a regular, writable FAISS store, which incremental updates need.
+    """
+    paths = mmap_store_paths(directory, index_name)
+    docstore = SQLiteDocstore(paths["docs"])
+    if in_memory:
+        index = faiss.read_index(paths["index"])
+        items = list(docstore.iter_documents())
+        docstore.close()
+        return FAISS(
+            embeddings,
+            index,
+            InMemoryDocstore(dict(items)),
+            {position: doc_id for position, (doc_id, _) in enumerate(items)},
+        )
+    # IO_FLAG_MMAP_IFC maps IndexFlatCodes storage; IO_FLAG_MMAP would only map on-disk IVF lists
+    index = faiss.read_index(paths["index"], faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    return FAISS(embeddings, index, docstore, SQLiteIndexMapping(docstore))
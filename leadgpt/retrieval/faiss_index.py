@@ -0,0 +1,72 @@
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Named index types -> faiss.index_factory strings ({nlist} and {m} are sized to the data)
+INDEX_TYPES = {
+    "flat": "Flat",
+    "sq8": "SQ8",
+    "pq": "PQ{m}",
+    "ivf": "IVF{nlist},Flat",
+    "ivf_sq8": "IVF{nlist},SQ8",
+    "ivf_pq": "IVF{nlist},PQ{m}",
+}
+# k-means wants about this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+# 8-bit PQ trains 256 centroids per sub-quantizer
+PQ_CENTROIDS = 256
+
+
+def _pq_subquantizers(dimensions: int, max_m: int) -> int:
+    """Largest divisor of `dimensions` not above `max_m` (PQ needs d % m == 0)."""
+    return max(m for m in range(1, min(max_m, dimensions) + 1) if dimensions % m == 0)
+
+
+def factory_string(index_type: str, dimensions: int, n_vectors: int, pq_m: int = 64) -> str:
+    """faiss.index_factory description for `index_type`, sized to the number of vectors.
+
+    Unknown names are passed through as raw factory strings. Types that cannot be trained
+    on this few vectors degrade gracefully: IVF is dropped below two lists' worth of
+    points, and PQ becomes SQ8 below 256 points.
+    """
+    description = INDEX_TYPES.get(index_type, index_type)
+    nlist = min(int(4 * math.sqrt(n_vectors)), n_vectors // MIN_POINTS_PER_CENTROID)
+    if "{nlist}" in description and nlist < 2:
+        description = description.split(",", 1)[1]
+    if "{m}" in description and n_vectors < PQ_CENTROIDS:
+        description = description.replace("PQ{m}", "SQ8")
+    return description.format(nlist=nlist, m=_pq_subquantizers(dimensions, pq_m))
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", pq_m: int = 64, nprobe: int = 8) -> faiss.Index:
+    """Train (if needed) and fill an L2 index of `index_type` with `vectors`."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dimensions = vectors.shape
+    index = faiss.index_factory(dimensions, factory_string(index_type, dimensions, n_vectors, pq_m), faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    set_nprobe(index, nprobe)
+    return index
+
+
+def convert_index(index: faiss.Index, index_type: str, pq_m: int = 64, nprobe: int = 8) -> faiss.Index:
+    """Rebuild an exact (flat) index as `index_type`, training on its own vectors."""
+    if index_type == "flat":
+        return index
+    return build_index(index.reconstruct_n(0, index.ntotal), index_type, pq_m, nprobe)
+
+
+def set_nprobe(index: faiss.Index, nprobe: int) -> Optional[faiss.Index]:
+    """Number of IVF lists scanned per query (recall vs latency); no-op for non-IVF indexes."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    return ivf
+
+
+def index_size(index: faiss.Index) -> int:
+    """Serialized size of the index in bytes."""
+    return int(faiss.serialize_index(index).size)
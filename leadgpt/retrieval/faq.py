@@ -0,0 +1,147 @@
+import hashlib
+import re
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+
+from leadgpt.text import fold_diacritics
+
+
+def parse_faq(text: str) -> List[Tuple[str, str]]:
+    """Parse "Question: ... / Answer: ..." blocks into (question, answer) pairs.
+
+    Lines without a prefix continue the previous field, and consecutive Answer lines
+    are joined. Exact duplicate pairs are dropped.
+    """
+    pairs: List[Tuple[str, str]] = []
+    question, answer, field = None, [], None
+
+    def flush():
+        if question and answer:
+            pair = (question, " ".join(answer))
+            if pair not in pairs:
+                pairs.append(pair)
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith("Question:"):
+            flush()
+            question, answer, field = line[len("Question:"):].strip(), [], "question"
+        elif line.startswith("Answer:"):
+            answer.append(line[len("Answer:"):].strip())
+            field = "answer"
+        elif field == "answer":
+            answer.append(line)
+        elif field == "question":
+            question = f"{question} {line}"
+    flush()
+    return pairs
+
+
+def record_id(question: str, answer: str) -> str:
+    """Content hash of a pair: unchanged pairs keep their id across data file edits."""
+    return hashlib.sha256(f"{question}\x00{answer}".encode("utf8")).hexdigest()
+
+
+class FAQLoader(BaseLoader):
+    """Load a Question/Answer file as one Document per pair.
+
+    The question is the page content (what gets embedded); the answer is carried in
+    the metadata so retrieval can return it without the surrounding pairs.
+    """
+
+    def __init__(self, file_path: str, encoding: str = "utf8"):
+        self.file_path = file_path
+        self.encoding = encoding
+
+    def lazy_load(self) -> Iterator[Document]:
+        with open(self.file_path, encoding=self.encoding) as f:
+            pairs = parse_faq(f.read())
+        for question, answer in pairs:
+            yield Document(
+                page_content=question,
+                metadata={"source": self.file_path, "id": record_id(question, answer), "question": question, "answer": answer},
+            )
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", fold_diacritics(text.lower())).split())
+
+
+class FAQMatch(NamedTuple):
+    question: str
+    answer: str
+    score: float
+
+
+class FAQMatcher:
+    """Precomputed lookup of customer messages that are (near) verbatim FAQ questions.
+
+    A normalized exact match scores 1.0; otherwise the best word-set overlap (Jaccard)
+    with a known question is used. Questions that appear with several different answers
+    are ambiguous and never matched.
+    """
+
+    def __init__(self, pairs: List[Tuple[str, str]], threshold: float = 0.85):
+        self.threshold = threshold
+        self._stats_lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.update(pairs)
+
+    def update(self, pairs: List[Tuple[str, str]]) -> None:
+        """Replace the known questions (after the FAQ data changed); stats are kept."""
+        answers: Dict[str, List[Tuple[str, str]]] = {}
+        for question, answer in pairs:
+            entries = answers.setdefault(normalize_question(question), [])
+            if answer not in [a for _, a in entries]:
+                entries.append((question, answer))
+        exact = {key: entries[0] for key, entries in answers.items() if len(entries) == 1 and key}
+        ambiguous = {key for key, entries in answers.items() if len(entries) > 1}
+        word_sets = [(set(key.split()), key) for key in exact]
+        # One assignment, so a concurrent lookup never mixes old and new tables
+        self._tables = (exact, ambiguous, word_sets)
+
+    @classmethod
+    def from_file(cls, file_path: str, threshold: float = 0.85, encoding: str = "utf8") -> "FAQMatcher":
+        with open(file_path, encoding=encoding) as f:
+            return cls(parse_faq(f.read()), threshold=threshold)
+
+    def _best(self, message: str) -> Optional[FAQMatch]:
+        exact, ambiguous, word_sets = self._tables
+        key = normalize_question(message)
+        if key in exact:
+            return FAQMatch(*exact[key], 1.0)
+        if key in ambiguous:
+            return None
+        words = set(key.split())
+        if not words:
+            return None
+        best_score, best_key = 0.0, None
+        for question_words, question_key in word_sets:
+            score = len(words & question_words) / len(words | question_words)
+            if score > best_score:
+                best_score, best_key = score, question_key
+        return FAQMatch(*exact[best_key], best_score) if best_key else None
+
+    def match(self, message: str) -> Optional[FAQMatch]:
+        """The FAQ entry `message` asks for, or None below the confidence threshold."""
+        match = self._best(message)
+        if match is not None and match.score < self.threshold:
+            match = None
+        with self._stats_lock:
+            self.lookups += 1
+            self.hits += match is not None
+        return match
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"lookups": self.lookups, "hits": self.hits, "hit_rate": self.hit_rate}
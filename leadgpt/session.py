@@ -0,0 +1,150 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from leadgpt.agent.lead_agent import LeadGPT
+
+# Rough fixed cost of an idle LeadGPT (memory objects, chains, attributes)
+SESSION_BASE_BYTES = 16 * 1024
+
+
+def estimate_session_size(lead: LeadGPT) -> int:
+    """Approximate the memory held by a session's conversation state."""
+    size = SESSION_BASE_BYTES
+    for msg in lead.chat_memory.messages:
+        size += sys.getsizeof(msg.content)
+    size += sys.getsizeof(lead.customer_info or "")
+    size += sys.getsizeof(lead.lead_summary_memory.buffer)
+    return size
+
+
+class SessionRegistry:
+    """Keep one LeadGPT per conversation and evict idle ones by LRU/TTL.
+
+    Sessions are created lazily through `factory`, so heavy objects (LLM clients,
+    tools) can be built once by the caller and shared by every session.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], LeadGPT],
+        max_sessions: int = 1000,
+        ttl_seconds: float = 1800,
+        max_memory_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.clock = clock
+
+        self._sessions: "OrderedDict[str, LeadGPT]" = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, session_id: str) -> LeadGPT:
+        """Return the session's LeadGPT, creating it on first use."""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            lead = self._sessions.get(session_id)
+            if lead is None:
+                lead = self.factory()
+                self._sessions[session_id] = lead
+                self.created += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            self._last_seen[session_id] = now
+            self._resize(session_id, estimate_session_size(lead))
+            self._evict(keep=session_id)
+            return lead
+
+    def touch(self, session_id: str) -> None:
+        """Re-measure a session after a turn grew its conversation, evicting others if needed."""
+        with self._lock:
+            lead = self._sessions.get(session_id)
+            if lead is None:
+                return
+            self._sessions.move_to_end(session_id)
+            self._last_seen[session_id] = self.clock()
+            self._resize(session_id, estimate_session_size(lead))
+            self._evict(keep=session_id)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        """Per-session lock so concurrent requests of one conversation run turn by turn."""
+        with self._lock:
+            return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def pop(self, session_id: str) -> Optional[LeadGPT]:
+        """Drop a session explicitly (e.g. when the customer ends the chat)."""
+        with self._lock:
+            return self._remove(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._total_size,
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _resize(self, session_id: str, size: int) -> None:
+        self._total_size += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+    def _busy(self, session_id: str) -> bool:
+        lock = self._locks.get(session_id)
+        return lock is not None and lock.locked()
+
+    def _remove(self, session_id: str) -> Optional[LeadGPT]:
+        lead = self._sessions.pop(session_id, None)
+        self._last_seen.pop(session_id, None)
+        if not self._busy(session_id):
+            # A running turn still holds the lock: the next request of this id must wait for it
+            self._locks.pop(session_id, None)
+        self._total_size -= self._sizes.pop(session_id, 0)
+        return lead
+
+    def _expire(self, now: float) -> None:
+        # OrderedDict keeps least recently used first, so stop at the first fresh one;
+        # sessions in the middle of a turn are never dropped
+        for session_id in list(self._sessions):
+            if now - self._last_seen[session_id] < self.ttl_seconds:
+                break
+            if self._busy(session_id):
+                continue
+            self._remove(session_id)
+            self.expired += 1
+
+    def _over_capacity(self) -> bool:
+        if len(self._sessions) > self.max_sessions:
+            return True
+        return self.max_memory_bytes is not None and self._total_size > self.max_memory_bytes
+
+    def _evict(self, keep: str) -> None:
+        for session_id in list(self._sessions):
+            if not self._over_capacity():
+                break
+            if session_id == keep or self._busy(session_id):
+                continue
+            self._remove(session_id)
+            self.evicted += 1
@@ -0,0 +1,26 @@
+import re
+import unicodedata
+from typing import List
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def fold_diacritics(text: str) -> str:
+    """Strip Vietnamese tone and vowel marks ("Đổi trả" -> "Doi tra")."""
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize_vietnamese(text: str) -> List[str]:
+    """Lowercased syllables, their unaccented forms and unaccented syllable bigrams.
+
+    Vietnamese words are often two syllables ("đổi trả", "vận chuyển"), so bigrams keep
+    them together; the unaccented forms let queries typed without diacritics match, while
+    an accented query still scores higher on the exact syllables.
+    """
+    syllables = TOKEN_PATTERN.findall(unicodedata.normalize("NFC", text.lower()))
+    folded = [fold_diacritics(syllable) for syllable in syllables]
+    tokens = list(syllables)
+    tokens.extend(f"~{plain}" for plain in folded)
+    tokens.extend(f"{a}_{b}" for a, b in zip(folded, folded[1:]))
+    return tokens
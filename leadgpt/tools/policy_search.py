@@ -1,55 +1,310 @@
 import os
-from typing import List
+import json
+import asyncio
+import threading
+from typing import Dict, List, Optional
 
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from leadgpt.config import EMBEDDINGS, DATA_TEXT_PATH, STORE_DIRECTORY
+from leadgpt.config import (
+    DATA_TEXT_PATH,
+    FAQ_FAST_PATH_ENABLED,
+    FAQ_FAST_PATH_THRESHOLD,
+    POLICY_STORE_DIRECTORY,
+    POLICY_SEARCH_K,
+    POLICY_DENSE_WEIGHT,
+    POLICY_BM25_WEIGHT,
+    POLICY_RRF_K,
+    POLICY_INDEX_FORMAT,
+    POLICY_INDEX_TYPE,
+    POLICY_IVF_NPROBE,
+    POLICY_PQ_M,
+)
+from leadgpt.embeddings import cached_embeddings, embedding_fingerprint, get_embeddings
+from leadgpt.retrieval.bm25 import BM25Index, reciprocal_rank_fusion
+from leadgpt.retrieval.docstore import (
+    SQLiteDocstore,
+    close_store,
+    load_mmap_store,
+    mmap_store_exists,
+    save_mmap_store,
+)
+from leadgpt.retrieval.faiss_index import convert_index, set_nprobe
+from leadgpt.retrieval.faq import FAQLoader, FAQMatcher
 
 class VectorStoreManager:
-    def __init__(self, data_path: str, store_directory: str, embeddings):
+    # One record per Question/Answer pair (the old "index" files hold 1000-char chunks)
+    index_name = "faq"
+
+    def __init__(
+        self,
+        data_path: str,
+        store_directory: str,
+        embeddings,
+        fingerprint: str = "",
+        index_format: str = "pickle",
+        index_type: str = "flat",
+        faq_matcher: Optional[FAQMatcher] = None,
+    ):
         self.data_path = data_path
         self.store_directory = store_directory
         self.embeddings = embeddings
+        # Identifies the embedding model; an index built with another one is rebuilt from scratch
+        self.fingerprint = fingerprint
+        # "pickle": FAISS.save_local/load_local; "mmap": memory-mapped vectors + SQLite documents
+        self.index_format = index_format
+        # FAISS index type (see leadgpt.retrieval.faiss_index.INDEX_TYPES), trained at build time
+        self.index_type = index_type
+        # Refreshed from the same records as the store, so reload() updates the FAQ fast path too
+        self.faq_matcher = faq_matcher
+        self.last_update = {"added": 0, "removed": 0}
+        self._reload_lock = threading.Lock()
+        # Searches in flight per store (by id), and replaced stores waiting for them to finish
+        self._readers: Dict[int, int] = {}
+        self._retired: Dict[int, object] = {}
+        self._readers_lock = threading.Lock()
         self.vectorstore = self.load_or_create_vectorstore()
+        self.bm25 = self.build_bm25(self.vectorstore)
 
-    def load_vectorstore(self):
-        return FAISS.load_local(
-            self.store_directory,
-            self.embeddings,
-            allow_dangerous_deserialization=True
-        )
+    def load_vectorstore(self, in_memory: bool = False):
+        if self.index_format == "mmap":
+            vectorstore = load_mmap_store(self.store_directory, self.index_name, self.embeddings, in_memory=in_memory)
+        else:
+            vectorstore = FAISS.load_local(
+                self.store_directory,
+                self.embeddings,
+                index_name=self.index_name,
+                allow_dangerous_deserialization=True
+            )
+        set_nprobe(vectorstore.index, POLICY_IVF_NPROBE)
+        return vectorstore
 
-    def create_vectorstore(self):
-        loader = TextLoader(self.data_path, encoding='utf8')
-        documents = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        document_chunks = text_splitter.split_documents(documents)
+    def load_documents(self):
+        loader = FAQLoader(self.data_path, encoding='utf8')
+        return loader.load()
 
-        vectorstore = FAISS.from_documents(document_chunks, self.embeddings)
-        vectorstore.save_local(self.store_directory)
-        return vectorstore
+    def create_vectorstore(self, documents=None):
+        documents = self.load_documents() if documents is None else documents
+
+        vectorstore = FAISS.from_documents(documents, self.embeddings, ids=[doc.metadata["id"] for doc in documents])
+        # from_documents builds an exact index; train the configured type on its vectors
+        vectorstore.index = convert_index(vectorstore.index, self.index_type, POLICY_PQ_M, POLICY_IVF_NPROBE)
+        self.save_vectorstore(vectorstore)
+        self.last_update = {"added": len(documents), "removed": 0}
+        return self.load_vectorstore() if self.index_format == "mmap" else vectorstore
+
+    def update_vectorstore(self, vectorstore, documents):
+        """Embed only new or changed records and delete the ones no longer in the data file.
+
+        Record ids are content hashes, so an edited answer is a removal plus an addition.
+        """
+        current = {doc.metadata["id"]: doc for doc in documents}
+        indexed = set(vectorstore.index_to_docstore_id.values())
+        removed = [doc_id for doc_id in indexed if doc_id not in current]
+        added = [doc for doc_id, doc in current.items() if doc_id not in indexed]
+        self.last_update = {"added": len(added), "removed": len(removed)}
+        if not removed and not added:
+            return vectorstore
+        if self.index_format == "mmap":
+            # The memory-mapped store is read-only: edit a loaded copy, then map the new files
+            close_store(vectorstore)
+            vectorstore = self.load_vectorstore(in_memory=True)
+        if removed:
+            vectorstore.delete(removed)
+        if added:
+            vectorstore.add_documents(added, ids=[doc.metadata["id"] for doc in added])
+        self.save_vectorstore(vectorstore)
+        return self.load_vectorstore() if self.index_format == "mmap" else vectorstore
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.store_directory, f"{self.index_name}.manifest.json")
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_vectorstore(self, vectorstore):
+        if self.index_format == "mmap":
+            save_mmap_store(vectorstore, self.store_directory, self.index_name)
+        else:
+            vectorstore.save_local(self.store_directory, index_name=self.index_name)
+        manifest = {
+            "embeddings": self.fingerprint,
+            "format": self.index_format,
+            "index_type": self.index_type,
+            "records": {
+                doc_id: vectorstore.docstore.search(doc_id).page_content
+                for doc_id in vectorstore.index_to_docstore_id.values()
+            },
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding='utf8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
 
     def check_existing_vectorstore(self):
-        return os.path.exists(os.path.join(self.store_directory, "index.faiss"))
+        if self.index_format == "mmap":
+            exists = mmap_store_exists(self.store_directory, self.index_name)
+        else:
+            exists = all(
+                os.path.exists(os.path.join(self.store_directory, f"{self.index_name}.{extension}"))
+                for extension in ("faiss", "pkl")
+            )
+        manifest = self.load_manifest()
+        return (
+            exists
+            and manifest.get("embeddings") == self.fingerprint
+            and manifest.get("format", "pickle") == self.index_format
+            and manifest.get("index_type", "flat") == self.index_type
+        )
 
     def load_or_create_vectorstore(self):
+        documents = self.load_documents()
         if self.check_existing_vectorstore():
-            return self.load_vectorstore()
+            vectorstore = self.update_vectorstore(self.load_vectorstore(), documents)
         else:
-            return self.create_vectorstore()
+            vectorstore = self.create_vectorstore(documents)
+        if self.faq_matcher is not None:
+            self.faq_matcher.update([(doc.metadata["question"], doc.metadata["answer"]) for doc in documents])
+        return vectorstore
+
+    def build_bm25(self, vectorstore) -> BM25Index:
+        """BM25 index over the same records as the FAISS store (question and answer text)."""
+        text_getter = lambda doc: f"{doc.page_content}\n{doc.metadata.get('answer', '')}"
+        if isinstance(vectorstore.docstore, SQLiteDocstore):
+            # Keep only ids in memory; hits are read back from SQLite like the dense ones
+            documents = (doc for _, doc in vectorstore.docstore.iter_documents())
+            return BM25Index(documents, text_getter=text_getter, docstore=vectorstore.docstore)
+        documents = [vectorstore.docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()]
+        return BM25Index(documents, text_getter=text_getter)
+
+    def _fuse(self, dense, bm25: BM25Index, query: str, k: int):
+        sparse = [doc for doc, _ in bm25.search(query, k=k)] if POLICY_BM25_WEIGHT > 0 else []
+        return reciprocal_rank_fusion(
+            [dense, sparse],
+            [POLICY_DENSE_WEIGHT, POLICY_BM25_WEIGHT],
+            k=k,
+            rrf_k=POLICY_RRF_K,
+        )
+
+    def _acquire(self):
+        with self._readers_lock:
+            vectorstore, bm25 = self.vectorstore, self.bm25
+            self._readers[id(vectorstore)] = self._readers.get(id(vectorstore), 0) + 1
+        return vectorstore, bm25
+
+    def _release(self, vectorstore) -> None:
+        with self._readers_lock:
+            self._readers[id(vectorstore)] -= 1
+            if self._readers[id(vectorstore)]:
+                return
+            del self._readers[id(vectorstore)]
+            retired = self._retired.pop(id(vectorstore), None)
+        if retired is not None:
+            close_store(retired)
+
+    def _retire(self, vectorstore) -> None:
+        """Close a replaced store now, or once the last search still using it is done."""
+        with self._readers_lock:
+            if self._readers.get(id(vectorstore)):
+                self._retired[id(vectorstore)] = vectorstore
+                return
+        close_store(vectorstore)
+
+    def hybrid_search(self, query: str, k: int = 4):
+        """FAISS and BM25 results merged with weighted reciprocal rank fusion."""
+        vectorstore, bm25 = self._acquire()
+        try:
+            dense = vectorstore.similarity_search(query, k=k) if POLICY_DENSE_WEIGHT > 0 else []
+            return self._fuse(dense, bm25, query, k)
+        finally:
+            self._release(vectorstore)
+
+    async def ahybrid_search(self, query: str, k: int = 4):
+        vectorstore, bm25 = self._acquire()
+        try:
+            dense = await vectorstore.asimilarity_search(query, k=k) if POLICY_DENSE_WEIGHT > 0 else []
+            return self._fuse(dense, bm25, query, k)
+        finally:
+            self._release(vectorstore)
+
+    def reload(self):
+        """Load the store again (e.g. after policy data changed) and swap it in.
+
+        Searches keep using the previous store until the new one is ready; it is closed
+        when the last of them finishes.
+        """
+        with self._reload_lock:
+            vectorstore = self.load_or_create_vectorstore()
+            bm25 = self.build_bm25(vectorstore)
+            with self._readers_lock:
+                previous = self.vectorstore
+                self.vectorstore, self.bm25 = vectorstore, bm25
+            if previous is not vectorstore:
+                self._retire(previous)
+        return self.vectorstore
 
     @staticmethod
-    def create(data_path: str, store_directory: str, embeddings):
-        return VectorStoreManager(data_path, store_directory, embeddings)
+    def create(
+        data_path: str,
+        store_directory: str,
+        embeddings,
+        fingerprint: str = "",
+        index_format: str = "pickle",
+        index_type: str = "flat",
+        faq_matcher: Optional[FAQMatcher] = None,
+    ):
+        return VectorStoreManager(data_path, store_directory, embeddings, fingerprint, index_format, index_type, faq_matcher)
+
+
+_vector_store_manager: Optional[VectorStoreManager] = None
+_vector_store_manager_lock = threading.Lock()
+_faq_matcher: Optional[FAQMatcher] = None
+_faq_matcher_lock = threading.Lock()
+
 
+def get_faq_matcher() -> FAQMatcher:
+    """FAQ fast-path matcher kept in sync with the policy store (empty until it is loaded)."""
+    global _faq_matcher
+    if _faq_matcher is None:
+        with _faq_matcher_lock:
+            if _faq_matcher is None:
+                _faq_matcher = FAQMatcher([], FAQ_FAST_PATH_THRESHOLD)
+    return _faq_matcher
 
-@tool
-def policy_search_tool(query: str) -> List[str]:
+
+def get_vector_store_manager() -> VectorStoreManager:
+    """Process-wide policy store, loaded once on first use and shared by all sessions."""
+    global _vector_store_manager
+    if _vector_store_manager is None:
+        with _vector_store_manager_lock:
+            if _vector_store_manager is None:
+                _vector_store_manager = VectorStoreManager.create(
+                    DATA_TEXT_PATH,
+                    POLICY_STORE_DIRECTORY,
+                    cached_embeddings(get_embeddings()),
+                    embedding_fingerprint(),
+                    POLICY_INDEX_FORMAT,
+                    POLICY_INDEX_TYPE,
+                    get_faq_matcher() if FAQ_FAST_PATH_ENABLED else None,
+                )
+    return _vector_store_manager
+
+
+def _matching_answers(documents) -> List[str]:
+    answers = []
+    for doc in documents:
+        answer = doc.metadata.get("answer", doc.page_content)
+        if answer not in answers:
+            answers.append(answer)
+    return answers
+
+
+def policy_search(query: str) -> List[str]:
     """
     Search for information related to company policies.
 
@@ -59,15 +314,25 @@ def policy_search_tool(query: str) -> List[str]:
     Returns:
         List[str]: The search results as a list of text strings.
     """
-    vector_store_manager = VectorStoreManager.create(
-        DATA_TEXT_PATH,
-        STORE_DIRECTORY,
-        EMBEDDINGS
-    )
+    vector_store_manager = get_vector_store_manager()
+
+    results = vector_store_manager.hybrid_search(query, k=POLICY_SEARCH_K)
+    return _matching_answers(results)
+
+
+async def apolicy_search(query: str) -> List[str]:
+    """Async version of policy_search."""
+    vector_store_manager = await asyncio.to_thread(get_vector_store_manager)
+
+    results = await vector_store_manager.ahybrid_search(query, k=POLICY_SEARCH_K)
+    return _matching_answers(results)
 
-    results = vector_store_manager.vectorstore.similarity_search(query, k=5)
-    return [doc.page_content for doc in results]
 
+policy_search_tool = StructuredTool.from_function(
+    func=policy_search,
+    coroutine=apolicy_search,
+    name="policy_search_tool",
+)
 
 # if __name__ == "__main__":
 #     # In ra tool name và tool description
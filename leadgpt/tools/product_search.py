@@ -1,12 +1,28 @@
-import sqlite3
-from typing import Union, List, Dict
+import asyncio
+from typing import Union, List, Dict, Optional, Tuple
 
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain.tools import tool
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langchain_core.tools import StructuredTool
 from langchain_google_genai import ChatGoogleGenerativeAI
 
-from leadgpt.config import GOOGLE_API_KEY, DATA_PRODUCT_PATH
+from leadgpt.config import (
+    GOOGLE_API_KEY,
+    DATA_PRODUCT_PATH,
+    LLM_CACHE_CHAINS,
+    PRODUCT_DB_IMMUTABLE,
+    PRODUCT_FILTER_PARSER_ENABLED,
+    PRODUCT_SQL_TEMPLATE_CACHE_ENABLED,
+    PRODUCT_COLUMNAR_ENGINE_ENABLED,
+    PRODUCT_SQL_GUARD_ENABLED,
+)
+from leadgpt.llm_cache import cached_llm, get_llm_response_cache
+from leadgpt.catalog.pool import get_connection_pool
+from leadgpt.catalog.fts import has_search_index, rewrite_like_to_fts
+from leadgpt.catalog.filters import get_product_filter_parser
+from leadgpt.catalog.columnar import get_columnar_catalog
+from leadgpt.catalog.guard import SQLGuard, get_sql_guard
+from leadgpt.catalog.templates import get_sql_template_cache, schema_fingerprint, slot_question
 
 PRODUCT_RECOMMENDATION_PROMPT = """
     You are a chatbot assistant specializing in providing product information and
@@ -28,6 +44,11 @@ PRODUCT_RECOMMENDATION_PROMPT = """
     stock_quantity: The quantity of the product available in stock (INTEGER)
     price: The price of the product (REAL)
 
+    Each available size and color is also listed separately, for exact filtering:
+
+    product_sizes: product_code (TEXT), size (TEXT), one row per size of a product
+    product_colors: product_code (TEXT), color (TEXT), one row per color of a product
+
     To provide product information or recommend products, generate an SQL query that:
 
     Handles product names in a case-insensitive manner and allows for partial matches.
@@ -41,6 +62,8 @@ PRODUCT_RECOMMENDATION_PROMPT = """
 """
 
 class ProductDataLoader:
+    """Runs queries on the calling thread's pooled read-only connection to db_path."""
+
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn = None
@@ -53,27 +76,95 @@ class ProductDataLoader:
         self.close()
 
     def connect(self):
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = get_connection_pool(self.db_path, immutable=PRODUCT_DB_IMMUTABLE).connection()
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        # The connection belongs to the pool and stays open for the next query on this thread
+        self.conn = None
 
     @staticmethod
     def clean_sql_query(query: str) -> str:
         return query.replace('```sql', '').replace('```', '').strip()
 
-    def execute_query(self, query: str, params: tuple = ()) -> List[Dict]:
+    def execute_query(self, query: str, params: tuple = (), guard: Optional[SQLGuard] = None) -> List[Dict]:
+        """Run a query; with a guard, untrusted SQL is checked, row-capped and time-bounded."""
         if not self.conn:
             self.connect()
         cursor = self.conn.cursor()
         cleaned_query = self.clean_sql_query(query)
-        cursor.execute(cleaned_query, params)
+        if guard is None:
+            cursor.execute(cleaned_query, params)
+            rows = cursor.fetchall()
+        else:
+            cleaned_query = guard.prepare(self.conn, cleaned_query, params)
+            with guard.limits(self.conn):
+                cursor.execute(cleaned_query, params)
+                rows = cursor.fetchall()
         columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-@tool
-def product_search_tool(input: str) -> Union[List[Dict], str]:
+        return [dict(zip(columns, row)) for row in rows]
+
+def _sql_generation_chain() -> Runnable:
+    llm = ChatGoogleGenerativeAI(temperature=0, model="gemini-1.5-flash", google_api_key=GOOGLE_API_KEY)
+    if "product_sql" in LLM_CACHE_CHAINS:
+        llm = cached_llm(llm, get_llm_response_cache())
+    prompt = PromptTemplate(
+        template=PRODUCT_RECOMMENDATION_PROMPT,
+        input_variables=["input"]
+    )
+    return {"input": RunnablePassthrough()} | prompt | llm
+
+
+def _local_product_search(input: str) -> Tuple[Optional[List[Dict]], Optional[Tuple]]:
+    """Results for `input` found without calling the LLM, if possible (None otherwise).
+
+    Plain filter searches are compiled by the filter parser (and answered from the
+    in-memory columnar catalog when enabled); other questions reuse the SQL generated for an
+    earlier question of the same shape. Also returns the template cache key (template,
+    slots, schema fingerprint) to store newly generated SQL under.
+    """
+    if not (PRODUCT_FILTER_PARSER_ENABLED or PRODUCT_SQL_TEMPLATE_CACHE_ENABLED):
+        return None, None
+    parser = get_product_filter_parser(DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE)
+    if parser is None:
+        return None, None
+    if PRODUCT_FILTER_PARSER_ENABLED:
+        product_filter = parser.parse(input)
+        if product_filter and PRODUCT_COLUMNAR_ENGINE_ENABLED:
+            return get_columnar_catalog(DATA_PRODUCT_PATH, PRODUCT_DB_IMMUTABLE).search(product_filter), None
+        if product_filter:
+            return _execute_product_query(*product_filter.to_sql()), None
+    if not PRODUCT_SQL_TEMPLATE_CACHE_ENABLED:
+        return None, None
+    with ProductDataLoader(f"{DATA_PRODUCT_PATH}") as product_data_loader:
+        fingerprint = schema_fingerprint(product_data_loader.conn)
+    template, slots = slot_question(input, parser)
+    cached_query = get_sql_template_cache().lookup(template, slots, fingerprint)
+    template_key = (template, slots, fingerprint)
+    # Templates hold LLM-written SQL, so they run under the guard like freshly generated SQL
+    return (_execute_product_query(*cached_query, guarded=True) if cached_query else None), template_key
+
+
+def _execute_product_query(query: str, params: Tuple = (), guarded: bool = False) -> List[Dict]:
+    guard = get_sql_guard() if guarded and PRODUCT_SQL_GUARD_ENABLED else None
+    with ProductDataLoader(f"{DATA_PRODUCT_PATH}") as product_data_loader:
+        return product_data_loader.execute_query(query, params, guard)
+
+
+def _execute_generated_query(query: str, template_key: Optional[Tuple] = None) -> List[Dict]:
+    """Run LLM-written SQL (LIKEs rewritten to FTS5) and keep it as a template for similar questions."""
+    with ProductDataLoader(f"{DATA_PRODUCT_PATH}") as product_data_loader:
+        query, params = ProductDataLoader.clean_sql_query(query), ()
+        if has_search_index(product_data_loader.conn):
+            # Partial text matches go through the FTS5 index instead of LIKE full scans
+            query, params = rewrite_like_to_fts(query)
+        guard = get_sql_guard() if PRODUCT_SQL_GUARD_ENABLED else None
+        results = product_data_loader.execute_query(query, tuple(params), guard)
+    if template_key:
+        get_sql_template_cache().store(*template_key, query, tuple(params))
+    return results
+
+
+def product_search(input: str) -> Union[List[Dict], str]:
     """
     Search for product information and return relevant details using SQLite.
 
@@ -100,28 +191,33 @@ def product_search_tool(input: str) -> Union[List[Dict], str]:
     - Customer needs assessment should only consider the information provided in these fields.
     """
     try:
-        llm = ChatGoogleGenerativeAI(temperature=0, model="gemini-1.5-flash", google_api_key=GOOGLE_API_KEY)
-        prompt = PromptTemplate(
-            template=PRODUCT_RECOMMENDATION_PROMPT,
-            input_variables=["input"]
-        )
-        
-        with ProductDataLoader(f"{DATA_PRODUCT_PATH}") as product_data_loader:
-            def execute_sql_query(query: str) -> List[Dict]:
-                return product_data_loader.execute_query(query)
-            
-            chain = (
-                {"input": RunnablePassthrough()}
-                | prompt
-                | llm
-                | (lambda x: execute_sql_query(x.content))
-            )
-            result = chain.invoke(input)
-        
-        return result
+        results, template_key = _local_product_search(input)
+        if results is not None:
+            return results
+        sql = _sql_generation_chain().invoke(input)
+        return _execute_generated_query(sql.content, template_key)
     except Exception as e:
         return f"An error occurred: {str(e)}"
 
+
+async def aproduct_search(input: str) -> Union[List[Dict], str]:
+    """Async version of product_search: awaits the LLM and runs SQLite off the event loop."""
+    try:
+        results, template_key = await asyncio.to_thread(_local_product_search, input)
+        if results is not None:
+            return results
+        sql = await _sql_generation_chain().ainvoke(input)
+        return await asyncio.to_thread(_execute_generated_query, sql.content, template_key)
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+
+product_search_tool = StructuredTool.from_function(
+    func=product_search,
+    coroutine=aproduct_search,
+    name="product_search_tool",
+)
+
 # if __name__ == "__main__":
 #     # In ra tool name và tool description
 #     print("Tool Name:", product_search_tool.name)
@@ -39,10 +39,7 @@ def main():
     
     while True:
         user_input = input("User: ")
-        lead.human_step(user_input)
-        lead.determine_conversation_stage()
-        lead.update_customer_info()
-        lead.agent_step()
+        lead.process_turn(user_input)
 
 #Run main loop
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""Micro-benchmark: per-turn framework overhead of the agent step.
+
+Compares rebuilding the prompt template, agent runnable and executor on every turn
+(the old agent_step) with reusing the executor built once per LeadGPT.
+A fake LLM answers instantly, so the timings are pure framework overhead.
+
+Run from the repo root: PYTHONPATH=. python test/bench_agent_step.py [turns]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from leadgpt.agent.lead_agent import LeadGPT
+
+FINAL_ANSWER = "Thought: Do i need to use a tool? No.\nDaisyBot: Dạ, em chào anh/chị ạ!"
+
+
+def bench(label, turns, step):
+    # LeadConvoOutputParser prints on every parse; keep it out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        step()  # warm up
+        start = time.perf_counter()
+        for _ in range(turns):
+            step()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / turns * 1e6:10.1f} us/turn")
+    return elapsed / turns
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lead = LeadGPT(FakeListChatModel(responses=[FINAL_ANSWER]), lead_name="DaisyBot")
+    lead.human_step("Xin chào")
+    inputs = lead._prepare_inputs()
+
+    build_only = bench("build executor only", turns, lead._build_agent_executor)
+    rebuilt = bench("rebuild + invoke (before)", turns, lambda: lead._build_agent_executor().invoke(inputs))
+    reused = bench("reuse + invoke (after)", turns, lambda: lead.lead_agent_executor.invoke(inputs))
+
+    print(f"\nsaved per turn: {(rebuilt - reused) * 1e6:.1f} us "
+          f"({(rebuilt - reused) / rebuilt:.0%} of framework overhead), "
+          f"build cost alone: {build_only * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: ProductFilter searches on SQLite (FTS5 + indexes) vs the in-memory ColumnarCatalog.
+
+Builds a synthetic catalog of --rows products by resampling data/products.db (names,
+materials, colors, sizes, brands, genders) with random prices and stock, loads it into
+an in-memory SQLite database with the search index and into a ColumnarCatalog, and
+times the same parsed queries on both.
+
+Run from the repo root: PYTHONPATH=. python test/bench_columnar_catalog.py [--rows 1000000]
+"""
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+
+from leadgpt.catalog.columnar import COLUMNS, ColumnarCatalog
+from leadgpt.catalog.filters import ProductFilterParser
+from leadgpt.catalog.fts import build_search_index
+
+QUERIES = [
+    "áo sơ mi trắng dưới 500k",
+    "quần nam size 30 còn hàng",
+    "váy đỏ từ 300k đến 1 triệu",
+    "đầm đen khoảng 800 nghìn",
+    "shop có áo len nào màu xám không",
+    "sản phẩm của ABC",
+    "vải cotton nữ",
+    "áo hoodie trên 2tr",
+    "size XL",
+]
+
+
+def synthetic_rows(n_rows, seed=0):
+    with sqlite3.connect("data/products.db") as conn:
+        base = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM products").fetchall()
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(base), size=n_rows)
+    prices = rng.integers(10, 300, size=n_rows) * 10_000
+    stock = rng.integers(0, 100, size=n_rows)
+    return [
+        (f"S{i:07d}", *base[pick][1:7], int(stock[i]), int(prices[i]))
+        for i, pick in enumerate(picks)
+    ]
+
+
+def timed(function, repeats):
+    function()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows)
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE products (product_code TEXT, product_name TEXT, material TEXT, size TEXT, color TEXT, "
+        "brand TEXT, gender TEXT, stock_quantity INTEGER, price INTEGER)"
+    )
+    conn.executemany(f"INSERT INTO products VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    start = time.perf_counter()
+    build_search_index(conn)
+    print(f"{args.rows} rows; SQLite index built in {time.perf_counter() - start:.1f}s", end="; ")
+    start = time.perf_counter()
+    catalog = ColumnarCatalog(rows)
+    print(f"columnar catalog loaded in {time.perf_counter() - start:.1f}s\n")
+
+    filter_parser = ProductFilterParser.from_connection(conn)
+    print(f"{'query':<36} {'rows':>5} {'sqlite us':>10} {'columnar us':>12} {'same':>5}")
+    for query in QUERIES:
+        product_filter = filter_parser.parse(query)
+        sql, params = product_filter.to_sql()
+        expected, sqlite_time = timed(lambda: conn.execute(sql, params).fetchall(), args.repeats)
+        found, columnar_time = timed(lambda: catalog.search(product_filter), args.repeats)
+        # Both return the cheapest matches; ties on price may come back in a different order
+        same = sorted(row[-1] for row in expected) == sorted(row["price"] for row in found)
+        print(f"{query:<36} {len(found):>5} {sqlite_time * 1e6:>10.1f} {columnar_time * 1e6:>12.1f} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: recall@k, query latency and size of the policy FAISS index types.
+
+Builds a synthetic corpus from the policy.txt vocabulary (sized with --docs), embeds it
+with the local HashingEmbeddings, and compares every index type against the exact flat
+index. Queries are random word subsets of corpus documents, like short customer questions.
+
+Run from the repo root: PYTHONPATH=. python test/bench_policy_index.py [--docs 5000] [--k 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from leadgpt.embeddings import HashingEmbeddings
+from leadgpt.retrieval.faiss_index import INDEX_TYPES, build_index, factory_string, index_size
+from leadgpt.text import TOKEN_PATTERN
+
+
+def synthetic_corpus(n_docs, n_queries, seed=0):
+    with open("data/policy.txt", encoding="utf8") as f:
+        vocabulary = sorted(set(TOKEN_PATTERN.findall(f.read().lower())))
+    rng = np.random.default_rng(seed)
+    # Zipf-like word frequencies and a per-document topic so documents cluster like real data
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    topics = [rng.choice(len(vocabulary), size=40, replace=False) for _ in range(max(n_docs // 200, 8))]
+    docs = []
+    for _ in range(n_docs):
+        topic = topics[rng.integers(len(topics))]
+        words = list(rng.choice(topic, size=12)) + list(rng.choice(len(vocabulary), size=20, p=weights / weights.sum()))
+        docs.append(" ".join(vocabulary[i] for i in words))
+    queries = []
+    for i in rng.integers(n_docs, size=n_queries):
+        words = docs[i].split()
+        queries.append(" ".join(rng.choice(words, size=min(6, len(words)), replace=False)))
+    return docs, queries
+
+
+def timed_search(index, queries, k):
+    index.search(queries[:1], k)  # warm up
+    start = time.perf_counter()
+    results = [index.search(queries[i:i + 1], k)[1][0] for i in range(len(queries))]
+    return np.array(results), (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    args = parser.parse_args()
+
+    docs, queries = synthetic_corpus(args.docs, args.queries)
+    embeddings = HashingEmbeddings(dimensions=args.dimensions)
+    start = time.perf_counter()
+    vectors = np.array(embeddings.embed_documents(docs), dtype=np.float32)
+    query_vectors = np.array(embeddings.embed_documents(queries), dtype=np.float32)
+    print(f"{len(docs)} docs x {args.dimensions} dims embedded in {time.perf_counter() - start:.1f}s, "
+          f"{len(queries)} queries, k={args.k}, nprobe={args.nprobe}\n")
+
+    baseline = None
+    print(f"{'type':<9} {'factory':<16} {'build s':>8} {'recall@k':>9} {'us/query':>9} {'size MB':>8}")
+    for index_type in args.types.split(","):
+        start = time.perf_counter()
+        index = build_index(vectors, index_type, pq_m=args.pq_m, nprobe=args.nprobe)
+        build_time = time.perf_counter() - start
+        ids, latency = timed_search(index, query_vectors, args.k)
+        if baseline is None:
+            # The first type is the reference (flat by default)
+            baseline = ids
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ids, baseline)])
+        description = factory_string(index_type, args.dimensions, len(docs), args.pq_m)
+        print(f"{index_type:<9} {description:<16} {build_time:8.2f} {recall:9.3f} "
+              f"{latency * 1e6:9.1f} {index_size(index) / 2 ** 20:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
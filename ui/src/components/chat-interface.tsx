@@ -33,6 +33,7 @@ export function ChatInterface() {
   const messagesEndRef = useRef<null | HTMLDivElement>(null);
   const thinkingProcessEndRef = useRef<null | HTMLDivElement>(null);
   const [botHasResponded, setBotHasResponded] = useState(false);
+  const sessionIdRef = useRef<string>(uuidv4());
 
   useEffect(() => {
     const handleResize = () => setMaxHeight(`${window.innerHeight - 200}px`);
@@ -67,26 +68,46 @@ export function ChatInterface() {
 
   const handleBotResponse = async (userMessage: string) => {
     setIsBotTyping(true);
+    const botMessageId = uuidv4();
+    let botMessageAdded = false;
+    const appendToBotMessage = (text: string) => {
+      if (!botMessageAdded) {
+        botMessageAdded = true;
+        setIsBotTyping(false);
+        setMessages(prev => [...prev, { id: botMessageId, text, sender: 'bot' }]);
+        return;
+      }
+      setMessages(prev => prev.map(m => (m.id === botMessageId ? { ...m, text: m.text + text } : m)));
+    };
+
     try {
-      const response = await fetch(`http://localhost:8000/chat`, {
+      const response = await fetch(`http://localhost:8000/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-Id': sessionIdRef.current,
         },
-        body: JSON.stringify({ content: userMessage }),
+        body: JSON.stringify({ content: userMessage, session_id: sessionIdRef.current }),
       });
 
-      if (!response.ok) throw new Error(`Network response was not ok: ${response.statusText}`);
-
-      const data = await response.json();
-      console.log('Bot response data:', data);
-      if (data && data.response) {
-        const parsedResponse = JSON.parse(data.response);
-        setThinkingProcess(parsedResponse);
-        setMessages(prev => [...prev, { id: uuidv4(), text: parsedResponse.final_response, sender: 'bot' }]);
-      } else {
-        console.error("Unexpected response format:", data);
-        throw new Error("Unexpected response format");
+      if (!response.ok || !response.body) throw new Error(`Network response was not ok: ${response.statusText}`);
+
+      // Server-Sent Events: frames are separated by a blank line, each has "event:" and "data:" lines
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop() || '';
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = frame.match(/^data: (.*)$/m)?.[1];
+          if (!event || data === undefined) continue;
+          handleStreamEvent(event, JSON.parse(data), appendToBotMessage, botMessageId);
+        }
       }
     } catch (error) {
       console.error("Failed to fetch bot's response:", error);
@@ -97,6 +118,54 @@ export function ChatInterface() {
     }
   };
 
+  const handleStreamEvent = (
+    event: string,
+    data: any,
+    appendToBotMessage: (text: string) => void,
+    botMessageId: string,
+  ) => {
+    switch (event) {
+      case 'stage':
+        setThinkingProcess({
+          ...data,
+          thoughts: [],
+          actions: [],
+          action_inputs: [],
+          observations: [],
+          final_thought: '',
+          final_response: '',
+        });
+        break;
+      case 'tool_start':
+        setThinkingProcess(prev => prev && {
+          ...prev,
+          actions: [...prev.actions, data.tool],
+          action_inputs: [...prev.action_inputs, data.input],
+        });
+        break;
+      case 'tool_end':
+        setThinkingProcess(prev => prev && {
+          ...prev,
+          observations: [...prev.observations, data.output ?? data.error],
+        });
+        break;
+      case 'token':
+        appendToBotMessage(data);
+        break;
+      case 'done':
+        setThinkingProcess(data);
+        // Nothing was streamed (e.g. the LLM does not stream): show the parsed answer
+        if (data.final_response) {
+          setMessages(prev => prev.some(m => m.id === botMessageId)
+            ? prev
+            : [...prev, { id: botMessageId, text: data.final_response, sender: 'bot' }]);
+        }
+        break;
+      case 'error':
+        throw new Error(data);
+    }
+  };
+
   const renderMessage = (message: Message) => (
     <div key={message.id} className="flex items-center p-2">
       {message.sender === 'user' ? (